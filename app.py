@@ -1,36 +1,64 @@
 import os
+import gzip
+import asyncio
+import time
+import functools
+import atexit
+import queue
 import logging
+import logging.handlers
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Response
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 import uvicorn
 
 from utils import (
-    parse_models_output,
     get_available_models,
+    refresh_available_models,
+    partition_portuguese_models,
     preprocess_pt_text,
-    get_wav_duration_seconds,
-    count_words,
     normalize_text,
+    normalize_and_count,
     split_text_into_chunks,
 )
-from tts_engine import synthesize_speech
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from tts_engine import (
+    CLONE_CHUNK_LENGTH,
+    XTTS_MODEL_NAME,
+    InvalidSpeakerError,
+    SynthResult,
+    synthesize_speech_batch,
+    synthesize_speech_stream,
+    compute_speaker_latents,
+    release_gpu_cache,
+    warm_model,
 )
+
+# Configure logging. Records are handed to a queue and written to stderr by a listener
+# thread, so request and synthesis threads never block on console I/O.
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(created).3f - %(name)s - %(levelname)s - %(message)s'))
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+# The queued record only needs its merged message; the listener's handler applies the format
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler], force=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="CoquiTTS API",
     description="REST API for CoquiTTS Text-to-Speech synthesis with support for 17 languages and voice cloning",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # Request models
@@ -68,94 +96,476 @@ output_dir = Path("/app/output")
 output_dir.mkdir(exist_ok=True)
 reference_audio_dir = Path("/app/reference_audio")
 reference_audio_dir.mkdir(exist_ok=True)
+reference_audio_path = reference_audio_dir / "reference_voice.wav"
+reference_audio_str = str(reference_audio_path)
 
-# API Routes
-@app.get("/")
-async def root():
-    """Root endpoint with API information"""
-    logger.info("Root endpoint accessed")
+# Generated audio files, oldest first: path -> (size, created_at). Once the total size goes
+# over AUDIO_CACHE_MAX_BYTES the oldest files are deleted, so disk usage stays capped.
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(1024 ** 3)))
+AUDIO_LRU: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+_audio_lru_bytes = 0
+
+
+def _track_audio_file(path: str, size: int, created_at: Optional[float] = None) -> None:
+    """Record a generated audio file and evict the oldest ones while over the size cap."""
+    global _audio_lru_bytes
+    AUDIO_LRU[path] = (size, created_at if created_at is not None else time.time())
+    _audio_lru_bytes += size
+    # Never evict the file that was just added, it is about to be served
+    while _audio_lru_bytes > AUDIO_CACHE_MAX_BYTES and len(AUDIO_LRU) > 1:
+        old_path, (old_size, _) = AUDIO_LRU.popitem(last=False)
+        _audio_lru_bytes -= old_size
+        try:
+            os.unlink(old_path)
+        except FileNotFoundError:
+            pass
+        logger.debug("Evicted audio file: %s (%d bytes)", old_path, old_size)
+
+
+async def _track_served_audio(path: str, size: int) -> None:
+    """Start tracking a file once its response has been sent, so eviction never races a download."""
+    _track_audio_file(path, size)
+
+
+def _scan_audio_files() -> List[Tuple[float, str, int]]:
+    """Return (mtime, path, size) for every WAV in the output directory, oldest first."""
+    existing = []
+    with os.scandir(output_dir) as it:
+        for entry in it:
+            if not entry.name.endswith(".wav") or not entry.is_file():
+                continue
+            st = entry.stat()
+            existing.append((st.st_mtime, entry.path, st.st_size))
+    return sorted(existing)
+
+
+def _sweep_output_dir() -> Tuple[int, int]:
+    """Delete every WAV in the output directory and return (files_deleted, bytes_freed).
+
+    Where supported, files are scanned and removed relative to an open directory descriptor
+    (fstatat/unlinkat), so the kernel only resolves the final path component per file.
+    """
+    deleted_count = 0
+    total_size = 0
+    use_dir_fd = os.unlink in os.supports_dir_fd and os.scandir in os.supports_fd
+    dir_fd = os.open(output_dir, os.O_RDONLY) if use_dir_fd else None
+    try:
+        # Scanning a descriptor yields entries whose `path` is relative to it
+        with os.scandir(dir_fd if dir_fd is not None else output_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".wav") or not entry.is_file():
+                    continue
+                file_size = entry.stat().st_size
+                try:
+                    os.unlink(entry.path, dir_fd=dir_fd)
+                except FileNotFoundError:
+                    continue
+                deleted_count += 1
+                total_size += file_size
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+    return deleted_count, total_size
+
+
+def _delete_audio_files(tracked: List[Tuple[str, int]]) -> Tuple[int, int]:
+    """Unlink the given tracked files, then sweep the output directory; return (count, bytes)."""
+    deleted_count = 0
+    total_size = 0
+    for path, file_size in tracked:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            continue
+        deleted_count += 1
+        total_size += file_size
+    # Pick up files this process did not track (e.g. written by another worker)
+    swept_count, swept_size = _sweep_output_dir()
+    return deleted_count + swept_count, total_size + swept_size
+
+
+# Synthesis runs in this executor so it never blocks the event loop. A single worker keeps
+# GPU access serialized and avoids concurrent CUDA context contention.
+SYNTH_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="synth")
+
+# Synthesis batching
+# Requests are queued and flushed to the engine in small batches grouped by
+# synthesis parameters and text length, so concurrent callers share one dispatch.
+MAX_BATCH = int(os.getenv("MAX_BATCH", "8"))
+BATCH_WINDOW_SECONDS = int(os.getenv("BATCH_WINDOW_MS", "20")) / 1000.0
+LENGTH_BUCKETS = (100, 300, 500)
+
+# Upper bound on synthesis requests admitted at once; excess callers wait before queueing,
+# so a burst can't pile up unbounded GPU work. Defaults to one full batch.
+MAX_INFLIGHT_SYNTH = int(os.getenv("MAX_INFLIGHT_SYNTH", str(MAX_BATCH)))
+
+synthesis_slots: Optional[asyncio.Semaphore] = None
+synthesis_queue: "Optional[asyncio.Queue[Tuple[str, Dict, asyncio.Future]]]" = None
+_batch_worker_task: Optional[asyncio.Task] = None
+
+
+def _length_bucket(text: str) -> int:
+    """Return the index of the length bucket the text falls into."""
+    for i, limit in enumerate(LENGTH_BUCKETS):
+        if len(text) < limit:
+            return i
+    return len(LENGTH_BUCKETS)
+
+
+async def _collect_batch() -> List[Tuple[str, Dict, asyncio.Future]]:
+    """Wait for one queued request, then keep filling the batch until the window closes."""
+    batch = [await synthesis_queue.get()]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + BATCH_WINDOW_SECONDS
+    while len(batch) < MAX_BATCH:
+        # Take whatever is already queued without arming a timeout per item
+        try:
+            batch.append(synthesis_queue.get_nowait())
+            continue
+        except asyncio.QueueEmpty:
+            pass
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(synthesis_queue.get(), timeout=remaining))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+async def _run_batch(batch: List[Tuple[str, Dict, asyncio.Future]]) -> None:
+    """Group a batch by parameters and length bucket and resolve each request's future."""
+    loop = asyncio.get_running_loop()
+    groups: Dict[Tuple, List[Tuple[str, Dict, asyncio.Future]]] = {}
+    for text, params, future in batch:
+        key = (tuple(sorted(params.items())), _length_bucket(text))
+        groups.setdefault(key, []).append((text, params, future))
+
+    for jobs in groups.values():
+        # Skip requests whose client already went away
+        pending = [(text, future) for text, _, future in jobs if not future.cancelled()]
+        if not pending:
+            continue
+        params = jobs[0][1]
+        try:
+            results = await loop.run_in_executor(
+                SYNTH_EXECUTOR,
+                functools.partial(synthesize_speech_batch, [text for text, _ in pending], **params),
+            )
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        # Each request gets its own outcome; one failed text doesn't fail the rest of its group
+        for (_, future), result in zip(pending, results):
+            if future.done():
+                if isinstance(result, SynthResult):
+                    # The client went away while its text was being synthesized
+                    Path(result.path).unlink(missing_ok=True)
+            elif isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+async def batch_worker():
+    logger.info("Synthesis batch worker started: max_batch=%d, window=%.0fms", MAX_BATCH, BATCH_WINDOW_SECONDS * 1000)
+    while True:
+        batch = await _collect_batch()
+        logger.debug("Dispatching synthesis batch of %d request(s)", len(batch))
+        try:
+            await _run_batch(batch)
+        except Exception as e:
+            logger.error("Synthesis batch failed: %s", e, exc_info=True)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        if synthesis_queue.empty():
+            # Idle: return the allocator's cached blocks so VRAM doesn't only ever grow
+            try:
+                await asyncio.get_running_loop().run_in_executor(SYNTH_EXECUTOR, release_gpu_cache)
+            except Exception as e:
+                logger.warning("Could not release GPU cache: %s", e)
+
+
+async def submit_synthesis(text: str, **params) -> SynthResult:
+    """Queue text for batched synthesis and return the generated audio file."""
+    async with synthesis_slots:
+        future = asyncio.get_running_loop().create_future()
+        await synthesis_queue.put((text, params, future))
+        return await future
+
+
+@app.on_event("startup")
+async def start_batch_worker():
+    global synthesis_slots, synthesis_queue, _batch_worker_task
+    # Created here so the queue and semaphore belong to the running event loop
+    synthesis_slots = asyncio.Semaphore(MAX_INFLIGHT_SYNTH)
+    synthesis_queue = asyncio.Queue()
+    _batch_worker_task = asyncio.create_task(batch_worker())
+
+
+@app.on_event("startup")
+async def load_audio_lru():
+    # Files left over from a previous run count towards the cap too
+    for mtime, path, size in await asyncio.to_thread(_scan_audio_files):
+        _track_audio_file(path, size, mtime)
+    logger.info("Tracking %d existing audio files (%d bytes)", len(AUDIO_LRU), _audio_lru_bytes)
+
+
+# Models loaded and exercised once at startup, so the first request per model isn't a cold start
+PRELOAD_MODELS = [
+    name.strip()
+    for name in os.getenv("PRELOAD_MODELS", f"{XTTS_MODEL_NAME},tts_models/pt/cv/vits").split(",")
+    if name.strip()
+]
+_warmup_task: Optional[asyncio.Task] = None
+_warmup_done = False
+
+
+async def _warm_models() -> None:
+    global _warmup_done
+    loop = asyncio.get_running_loop()
+    for model_name in PRELOAD_MODELS:
+        try:
+            await loop.run_in_executor(SYNTH_EXECUTOR, warm_model, model_name)
+            logger.info("Warmed up %s", model_name)
+        except Exception as e:
+            logger.warning("Could not preload %s: %s", model_name, e)
+    if reference_audio_path.exists():
+        # The engine memoizes the voice's latents, so cloning requests find them ready
+        try:
+            await loop.run_in_executor(SYNTH_EXECUTOR, compute_speaker_latents, reference_audio_str)
+        except Exception as e:
+            logger.warning("Could not precompute speaker latents for %s: %s", reference_audio_str, e)
+    _warmup_done = True
+
+
+@app.on_event("startup")
+async def warm_models():
+    # Warm up in the background so /health answers while models load; /ready reports completion
+    global _warmup_task
+    _warmup_task = asyncio.create_task(_warm_models())
+
+
+@app.on_event("shutdown")
+async def stop_batch_worker():
+    for task in (_batch_worker_task, _warmup_task, _models_warmup_task):
+        if task is not None:
+            task.cancel()
+
+# Model catalog cache: the `tts --list_models` result (memoized by utils until /models/refresh)
+# plus the serialized endpoint bodies, rebuilt only when that result changes
+_MODELS_CACHE: Dict[str, Any] = {
+    "result": None,
+    "models_body": b"",
+    "models_media_type": "text/plain",
+    "models_gzip": None,
+    "portuguese_json": b"",
+    "portuguese_gzip": None,
+}
+# Bodies at least this large are also kept gzip-compressed. Compressing here rather than with
+# GZipMiddleware does it once per refresh, and keeps the middleware off the WAV responses.
+GZIP_MIN_SIZE = 1024
+
+
+def _gzip_body(body: bytes) -> Optional[bytes]:
+    """Gzip a cached body, or None when it is too small to be worth it."""
+    if len(body) < GZIP_MIN_SIZE:
+        return None
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def _prefers_gzip(accept_encoding: str) -> bool:
+    """Return whether an Accept-Encoding header takes gzip at least as gladly as the plain body.
+
+    Codings are weighed by their q-values: gzip (or x-gzip, else `*`) must be above 0 and not
+    below identity (else `*`). An identity the header doesn't list doesn't outrank gzip.
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    gzip_weight = weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0)))
+    return gzip_weight > 0 and gzip_weight >= weights.get("identity", weights.get("*", 0.0))
+
+
+def _cached_body_response(request: Request, body: bytes, gzipped: Optional[bytes], media_type: str) -> Response:
+    """Return a cached body, gzip-encoded when there is a compressed copy and the client prefers it."""
+    if gzipped is not None and _prefers_gzip(request.headers.get("accept-encoding", "")):
+        return Response(
+            content=gzipped,
+            media_type=media_type,
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+    headers = {"Vary": "Accept-Encoding"} if gzipped is not None else None
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _portuguese_view(all_models: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build the /models/portuguese payload from the parsed model list."""
+    pt_models, multilingual_models = partition_portuguese_models(all_models)
+    all_pt_models = pt_models + multilingual_models
+    logger.info("Found %d Portuguese-specific and %d multilingual models", len(pt_models), len(multilingual_models))
     return {
-        "message": "CoquiTTS API Server",
-        "version": "1.0.0",
-        "endpoints": {
-            "/models": "List all available TTS models",
-            "/models/portuguese": "List Portuguese TTS models",
-            "/synthesize": "Synthesize speech from text",
-            "/synthesize/portuguese": "Quick Portuguese synthesis",
-            "/synthesize/clone_voice": "Synthesize speech using your cloned voice (Brazilian Portuguese)",
+        "models": all_pt_models,
+        "count": len(all_pt_models),
+        "portuguese_specific": len(pt_models),
+        "multilingual": len(multilingual_models),
+        "status": "success",
+    }
+
+
+async def _cached_models() -> Dict[str, Any]:
+    """Return the model catalog and its cached endpoint bodies, rebuilding them when the catalog changes."""
+    result = await get_available_models()
+    if result is not _MODELS_CACHE["result"]:
+        portuguese = _portuguese_view(result.models)
+        # Both endpoints' bodies are serialized once per refresh, warnings included,
+        # so a request only writes cached bytes
+        if result.status == "ok":
+            models_body, models_media_type = result.text.encode("utf-8"), "text/plain"
+            portuguese_json = ORJSONResponse(content=portuguese).body
+        else:
+            models_body = ORJSONResponse(
+                content={"status": "warning", "message": result.text, "models": [], "count": 0}
+            ).body
+            models_media_type = "application/json"
+            portuguese_json = ORJSONResponse(
+                content={"models": [], "count": 0, "message": result.text, "status": "warning"}
+            ).body
+        _MODELS_CACHE.update(
+            result=result,
+            models_body=models_body,
+            models_media_type=models_media_type,
+            models_gzip=_gzip_body(models_body),
+            portuguese_json=portuguese_json,
+            portuguese_gzip=_gzip_body(portuguese_json),
+        )
+    return _MODELS_CACHE
+
+
+_models_warmup_task: Optional[asyncio.Task] = None
+
+
+@app.on_event("startup")
+async def warm_models_cache():
+    # Read the catalog (models.json, or the CLI for up to 180 s) in the background, so the first
+    # /models request finds it ready; requests arriving earlier wait on the same fetch
+    global _models_warmup_task
+    _models_warmup_task = asyncio.create_task(_cached_models())
+
+
+# Static responses, built once at import time
+ROOT_RESPONSE = {
+    "message": "CoquiTTS API Server",
+    "version": "1.0.0",
+    "endpoints": {
+        "/ready": "Readiness check (200 once startup model warmup has finished)",
+        "/models": "List all available TTS models",
+        "/models/portuguese": "List Portuguese TTS models",
+        "/models/refresh": "Re-read the TTS model catalog",
+        "/synthesize": "Synthesize speech from text",
+        "/synthesize/portuguese": "Quick Portuguese synthesis",
+        "/synthesize/clone_voice": "Synthesize speech using your cloned voice (Brazilian Portuguese)",
+        "/synthesize/stream": "Stream synthesized speech as it is generated",
+    },
+    "supported_languages": {
+        "description": "Available language codes for multilingual models (XTTS v2)",
+        "codes": ["en", "es", "fr", "de", "it", "pt", "pl", "tr", "ru", "nl", "cs", "ar", "zh-cn", "hu", "ko", "ja", "hi"],
+        "default": "en"
+    },
+    "parameters": {
+        "model_name": {
+            "description": "TTS model to use",
+            "default": "tts_models/multilingual/multi-dataset/xtts_v2",
+            "example": "tts_models/multilingual/multi-dataset/xtts_v2"
         },
-        "supported_languages": {
-            "description": "Available language codes for multilingual models (XTTS v2)",
-            "codes": ["en", "es", "fr", "de", "it", "pt", "pl", "tr", "ru", "nl", "cs", "ar", "zh-cn", "hu", "ko", "ja", "hi"],
-            "default": "en"
+        "speaker_idx": {
+            "description": "Speaker index for multi-speaker models (optional)",
+            "example": 0
         },
-        "parameters": {
-            "model_name": {
-                "description": "TTS model to use",
-                "default": "tts_models/multilingual/multi-dataset/xtts_v2",
-                "example": "tts_models/multilingual/multi-dataset/xtts_v2"
-            },
-            "speaker_idx": {
-                "description": "Speaker index for multi-speaker models (optional)",
-                "example": 0
-            },
-            "language_idx": {
-                "description": "Language code for multilingual models",
-                "supported": ["en", "es", "fr", "de", "it", "pt", "pl", "tr", "ru", "nl", "cs", "ar", "zh-cn", "hu", "ko", "ja", "hi"],
-                "default": "en",
-                "example": "fr"
-            }
+        "language_idx": {
+            "description": "Language code for multilingual models",
+            "supported": ["en", "es", "fr", "de", "it", "pt", "pl", "tr", "ru", "nl", "cs", "ar", "zh-cn", "hu", "ko", "ja", "hi"],
+            "default": "en",
+            "example": "fr"
         }
     }
+}
+HEALTH_RESPONSE = {"status": "healthy", "service": "coqui-tts-api"}
+READY_RESPONSE = {"status": "ready", "service": "coqui-tts-api"}
+WARMING_UP_RESPONSE = {"status": "warming_up", "service": "coqui-tts-api"}
+
+# API Routes
+@app.get("/")
+async def root():
+    """Root endpoint with API information"""
+    logger.debug("Root endpoint accessed")
+    return ROOT_RESPONSE
 
 @app.get("/health")
 async def health_check():
-    logger.info("Health check endpoint accessed")
-    return {"status": "healthy", "service": "coqui-tts-api"}
+    logger.debug("Health check endpoint accessed")
+    return HEALTH_RESPONSE
+
+@app.get("/ready")
+async def readiness_check():
+    if not _warmup_done:
+        return ORJSONResponse(status_code=503, content=WARMING_UP_RESPONSE)
+    return READY_RESPONSE
 
 @app.get("/models")
-async def list_models():
+async def list_models(request: Request):
     try:
-        models_list = get_available_models()
-        if "No models found" in models_list or "Error" in models_list or "unavailable" in models_list:
-            return {
-                "status": "warning",
-                "message": models_list,
-                "models": [],
-                "count": 0,
-            }
-        return Response(content=models_list, media_type="text/plain")
+        cache = await _cached_models()
+        return _cached_body_response(
+            request, cache["models_body"], cache["models_gzip"], cache["models_media_type"]
+        )
     except Exception as e:
         error_msg = f"Error listing models: {str(e)}"
         logger.error(error_msg, exc_info=True)
         return {"status": "error", "message": error_msg, "models": [], "count": 0}
 
 @app.get("/models/portuguese")
-async def list_portuguese_models():
+async def list_portuguese_models(request: Request):
     try:
-        models_output = get_available_models()
-        if isinstance(models_output, str) and (
-            "No models found" in models_output or "Error" in models_output or "unavailable" in models_output
-        ):
-            return {"models": [], "count": 0, "message": models_output, "status": "warning"}
-
-        all_models = parse_models_output(models_output)
-        pt_models = [m for m in all_models if m.get("language", "").lower() in ["pt", "portuguese", "pt-br", "pt_br"]]
-        multilingual_models = [m for m in all_models if m.get("language", "").lower() == "multilingual"]
-        all_pt_models = pt_models + multilingual_models
-        logger.info("Found %d Portuguese-specific and %d multilingual models", len(pt_models), len(multilingual_models))
-        return {
-            "models": all_pt_models,
-            "count": len(all_pt_models),
-            "portuguese_specific": len(pt_models),
-            "multilingual": len(multilingual_models),
-            "status": "success",
-        }
+        cache = await _cached_models()
+        return _cached_body_response(
+            request, cache["portuguese_json"], cache["portuguese_gzip"], "application/json"
+        )
     except Exception as e:
         error_msg = f"Error listing Portuguese models: {str(e)}"
         logger.error(error_msg, exc_info=True)
         return {"status": "error", "message": error_msg, "models": [], "count": 0}
 
+@app.post("/models/refresh")
+async def refresh_models():
+    """Drop the cached model catalog and fetch it again from the TTS CLI."""
+    try:
+        await refresh_available_models()
+        result = (await _cached_models())["result"]
+        if result.status != "ok":
+            return {"status": "warning", "message": result.text, "models": [], "count": 0}
+        return {"status": "success", "count": len(result.models)}
+    except Exception as e:
+        error_msg = f"Error refreshing models: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        return {"status": "error", "message": error_msg, "models": [], "count": 0}
+
 @app.post(
     "/synthesize",
     summary="Synthesize speech from text",
@@ -196,24 +606,27 @@ async def synthesize_text(request: TTSRequest):
 
         # Use default model if none specified
         model_name = request.model_name or "tts_models/multilingual/multi-dataset/xtts_v2"
-        logger.info("Starting synthesis: text='%s...', model=%s", request.text[:50], model_name)
+        logger.debug("Starting synthesis: text='%s...', model=%s", request.text[:50], model_name)
 
-        normalized_text = normalize_text(request.text)
-        audio_path = synthesize_speech(
-            text=normalized_text,
+        normalized_text, word_count = normalize_and_count(request.text)
+        result = await submit_synthesis(
+            normalized_text,
             model_name=model_name,
             speaker_idx=request.speaker_idx,
             language_idx=request.language_idx,
         )
-        logger.info("Synthesis completed successfully: %s", audio_path)
+        logger.debug("Synthesis completed successfully: %s", result.path)
+        stat_result = os.stat(result.path)
         return FileResponse(
-            path=audio_path,
+            path=result.path,
             media_type="audio/wav",
-            filename=f"synthesis_{Path(audio_path).stem}.wav",
+            filename=f"synthesis_{result.stem}.wav",
+            stat_result=stat_result,
+            background=BackgroundTask(_track_served_audio, result.path, stat_result.st_size),
             headers={
                 "Content-Disposition": "attachment",
-                "X-Audio-Duration": str(round(get_wav_duration_seconds(audio_path), 3)),
-                "X-Word-Count": str(count_words(normalized_text)),
+                "X-Audio-Duration": str(round(result.duration_s, 3)),
+                "X-Word-Count": str(word_count),
             },
         )
     except HTTPException:
@@ -247,7 +660,6 @@ async def synthesize_with_cloned_voice(request: TextRequest):
             logger.warning("Voice cloning synthesis request rejected: empty text")
             raise HTTPException(status_code=400, detail="Text cannot be empty")
 
-        reference_audio_path = reference_audio_dir / "reference_voice.wav"
         if not reference_audio_path.exists():
             logger.error("Reference audio not found: %s", reference_audio_path)
             raise HTTPException(
@@ -258,23 +670,28 @@ async def synthesize_with_cloned_voice(request: TextRequest):
                 ),
             )
 
-        logger.info("Starting voice cloning synthesis: text='%s...', reference=%s", request.text[:50], reference_audio_path)
-        processed_text = preprocess_pt_text(request.text)
-        audio_path = synthesize_speech(
-            text=processed_text,
-            model_name="tts_models/multilingual/multi-dataset/xtts_v2",
-            speaker_wav=str(reference_audio_path),
+        logger.debug("Starting voice cloning synthesis: text='%s...', reference=%s", request.text[:50], reference_audio_path)
+        processed_text, word_count = normalize_and_count(request.text, lang="pt")
+        # The whole text goes to the engine as one item, which splits it and runs the chunks as a
+        # single job on the loaded model instead of scattering them across batches
+        result = await submit_synthesis(
+            processed_text,
+            model_name=XTTS_MODEL_NAME,
+            speaker_wav=reference_audio_str,
             language_idx="pt",
         )
-        logger.info("Voice cloning synthesis completed successfully: %s", audio_path)
+        logger.debug("Voice cloning synthesis completed successfully: %s", result.path)
+        stat_result = os.stat(result.path)
         return FileResponse(
-            path=audio_path,
+            path=result.path,
             media_type="audio/wav",
-            filename=f"cloned_voice_synthesis_{Path(audio_path).stem}.wav",
+            filename=f"cloned_voice_synthesis_{result.stem}.wav",
+            stat_result=stat_result,
+            background=BackgroundTask(_track_served_audio, result.path, stat_result.st_size),
             headers={
                 "Content-Disposition": "attachment",
-                "X-Audio-Duration": str(round(get_wav_duration_seconds(audio_path), 3)),
-                "X-Word-Count": str(count_words(processed_text)),
+                "X-Audio-Duration": str(round(result.duration_s, 3)),
+                "X-Word-Count": str(word_count),
             },
         )
     except HTTPException:
@@ -284,6 +701,105 @@ async def synthesize_with_cloned_voice(request: TextRequest):
         logger.error(error_msg, exc_info=True)
         raise HTTPException(status_code=500, detail=error_msg)
 
+# A stream's generator runs up to this many pieces ahead of the client, so the next audio is
+# being synthesized while the previous one is still being sent
+STREAM_PREFETCH_CHUNKS = int(os.getenv("STREAM_PREFETCH_CHUNKS", "4"))
+
+
+async def _prefetch_stream(iterator: Iterator[bytes], queue: "asyncio.Queue[Any]") -> None:
+    """Advance a blocking audio generator on the synthesis executor, queueing each piece.
+
+    The queue gets None at the end, or the exception the generator raised.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            # Each generation step takes a slot, so streams share the same in-flight cap as batches
+            async with synthesis_slots:
+                chunk = await loop.run_in_executor(SYNTH_EXECUTOR, next, iterator, None)
+            await queue.put(chunk)
+            if chunk is None:
+                return
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        await queue.put(e)
+    finally:
+        # Queued behind any step still running on the single synthesis thread
+        SYNTH_EXECUTOR.submit(iterator.close)
+
+
+def _start_stream(iterator: Iterator[bytes]) -> bytes:
+    """Pull a stream's WAV header together with its first piece of audio.
+
+    Once the response starts, a failure can only cut the WAV short, so errors up to the first
+    audio (model load, bad speaker or language, the first inference step) are raised here instead.
+    """
+    header = next(iterator)
+    return header + next(iterator, b"")
+
+
+async def _iterate_in_executor(first: bytes, iterator: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Bridge a blocking audio generator to an async one, generating ahead while pieces are sent."""
+    queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=STREAM_PREFETCH_CHUNKS)
+    producer = asyncio.create_task(_prefetch_stream(iterator, queue))
+    try:
+        yield first
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        producer.cancel()
+
+
+@app.post(
+    "/synthesize/stream",
+    summary="Stream synthesized speech",
+    description="""
+    Stream speech while it is being generated, so playback can start before synthesis finishes.
+
+    The response is a WAV stream whose header declares an unknown length. Accepts the same body as
+    `/synthesize`. XTTS v2 streams as it decodes; other models stream one text chunk at a time.
+
+    **Example:**
+    ```json
+    {"text": "Hello world", "language_idx": "en"}
+    ```
+    """,
+    response_description="WAV audio stream",
+)
+async def synthesize_stream(request: TTSRequest):
+    try:
+        if not request.text or not request.text.strip():
+            logger.warning("Streaming synthesis request rejected: empty text")
+            raise HTTPException(status_code=400, detail="Text cannot be empty")
+        model_name = request.model_name or XTTS_MODEL_NAME
+
+        logger.debug("Starting streaming synthesis: text='%s...', model=%s", request.text[:50], model_name)
+        iterator = synthesize_speech_stream(
+            normalize_text(request.text),
+            language_idx=request.language_idx,
+            speaker_idx=request.speaker_idx,
+            model_name=model_name,
+        )
+        # Pull the header and first audio here so early failures still produce a proper error response
+        async with synthesis_slots:
+            first = await asyncio.get_running_loop().run_in_executor(SYNTH_EXECUTOR, _start_stream, iterator)
+        return StreamingResponse(_iterate_in_executor(first, iterator), media_type="audio/wav")
+    except HTTPException:
+        raise
+    except InvalidSpeakerError as e:
+        logger.warning("Streaming synthesis request rejected: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        error_msg = f"Streaming synthesis failed: {str(e)}"
+        logger.error(error_msg, exc_info=True)
+        raise HTTPException(status_code=500, detail=error_msg)
+
 @app.post("/debug/clone-voice/preview")
 async def debug_clone_voice_preview(request: TextRequest):
     """Return the normalized text, preprocessed text, and chunk preview for debugging."""
@@ -291,8 +807,8 @@ async def debug_clone_voice_preview(request: TextRequest):
         raw = request.text or ""
         normalized = normalize_text(raw)
         preprocessed = preprocess_pt_text(raw)
-        # For preview, use the same chunking logic as TTS voice cloning path (500 chars)
-        chunks = split_text_into_chunks(preprocessed, max_length=500)
+        # For preview, use the same chunking as the engine applies to voice cloning
+        chunks = split_text_into_chunks(preprocessed, max_length=CLONE_CHUNK_LENGTH)
         return {
             "normalized_text": normalized,
             "preprocessed_text": preprocessed,
@@ -306,15 +822,13 @@ async def debug_clone_voice_preview(request: TextRequest):
 
 @app.delete("/cleanup")
 async def cleanup_audio_files():
+    global _audio_lru_bytes
     try:
-        deleted_count = 0
-        total_size = 0
-        for audio_file in output_dir.glob("*.wav"):
-            file_size = audio_file.stat().st_size
-            audio_file.unlink()
-            deleted_count += 1
-            total_size += file_size
-            logger.info("Deleted audio file: %s (%d bytes)", audio_file, file_size)
+        # Take the tracked files off the LRU here on the loop; the unlinks run in a thread
+        tracked = [(path, size) for path, (size, _) in AUDIO_LRU.items()]
+        AUDIO_LRU.clear()
+        _audio_lru_bytes = 0
+        deleted_count, total_size = await asyncio.to_thread(_delete_audio_files, tracked)
         logger.info("Cleanup completed: %d files, %d bytes freed", deleted_count, total_size)
         return {"message": f"Cleaned up {deleted_count} audio files", "files_deleted": deleted_count, "bytes_freed": total_size}
     except Exception as e:
@@ -322,4 +836,13 @@ async def cleanup_audio_files():
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Each worker process loads its own XTTS model, so keep a single worker by default and let the
+    # batching scheduler handle GPU concurrency. Raise WEB_CONCURRENCY only if VRAM allows it.
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
\ No newline at end of file
@@ -0,0 +1,301 @@
+import sys
+import asyncio
+from pathlib import Path
+
+# Ensure project root is on sys.path for module imports like `app`
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+import app
+from tts_engine import SynthResult
+
+
+@pytest.fixture
+def fake_engine(monkeypatch):
+    """Replace the engine's batch entry point; returns the (texts, params) of each dispatch."""
+    calls = []
+
+    def synthesize_speech_batch(texts, **params):
+        calls.append((texts, params))
+        if params.get("model_name") == "broken":
+            raise RuntimeError("model won't load")
+        return [
+            RuntimeError(f"cannot say {text}") if text.startswith("bad")
+            else SynthResult(f"/tmp/{text}.wav", 1.0, 22050, text)
+            for text in texts
+        ]
+
+    monkeypatch.setattr(app, "synthesize_speech_batch", synthesize_speech_batch)
+    return calls
+
+
+def _run_batch(items):
+    """Run one `_run_batch` over (text, params) items and return their futures."""
+    async def run():
+        loop = asyncio.get_running_loop()
+        batch = [(text, params, loop.create_future()) for text, params in items]
+        await app._run_batch(batch)
+        return [future for _, _, future in batch]
+
+    return asyncio.run(run())
+
+
+def test_run_batch_groups_by_params_and_length(fake_engine):
+    xtts = {"model_name": "xtts"}
+    clone = {"model_name": "xtts", "speaker_wav": "/voice.wav"}
+    long_text = "x" * 200
+
+    futures = _run_batch([
+        ("one", xtts), ("two", xtts), ("three", {"model_name": "vits"}), (long_text, xtts), ("four", clone),
+    ])
+
+    assert fake_engine == [
+        (["one", "two"], xtts),
+        (["three"], {"model_name": "vits"}),
+        ([long_text], xtts),
+        (["four"], clone),
+    ]
+    assert [f.result().stem for f in futures] == ["one", "two", "three", long_text, "four"]
+
+
+def test_run_batch_failures_reach_only_their_own_futures(fake_engine):
+    ok, bad, broken = _run_batch([
+        ("ok", {"model_name": "xtts"}), ("bad", {"model_name": "xtts"}), ("any", {"model_name": "broken"}),
+    ])
+
+    assert ok.result().stem == "ok"
+    with pytest.raises(RuntimeError, match="cannot say bad"):
+        bad.result()
+    with pytest.raises(RuntimeError, match="won't load"):
+        broken.result()
+
+
+def test_run_batch_skips_cancelled_and_discards_results_nobody_waits_for(monkeypatch, tmp_path):
+    calls = []
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        gone, leaving, waiting = (loop.create_future() for _ in range(3))
+        gone.cancel()
+
+        def synthesize_speech_batch(texts, **params):
+            calls.append(texts)
+            # This client disconnects while its text is being synthesized
+            loop.call_soon_threadsafe(leaving.cancel)
+            results = []
+            for text in texts:
+                path = tmp_path / f"{text}.wav"
+                path.write_bytes(b"RIFF")
+                results.append(SynthResult(str(path), 1.0, 22050, text))
+            return results
+
+        monkeypatch.setattr(app, "synthesize_speech_batch", synthesize_speech_batch)
+        await app._run_batch([("gone", {}, gone), ("leaving", {}, leaving), ("waiting", {}, waiting)])
+        return waiting.result()
+
+    result = asyncio.run(run())
+
+    assert calls == [["leaving", "waiting"]]
+    assert result.stem == "waiting"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["waiting.wav"]
+
+
+def test_submit_synthesis_shares_one_dispatch_through_the_worker(fake_engine, monkeypatch):
+    async def run():
+        monkeypatch.setattr(app, "synthesis_slots", asyncio.Semaphore(app.MAX_INFLIGHT_SYNTH))
+        monkeypatch.setattr(app, "synthesis_queue", asyncio.Queue())
+        worker = asyncio.create_task(app.batch_worker())
+        try:
+            return await asyncio.gather(
+                app.submit_synthesis("one", model_name="xtts"),
+                app.submit_synthesis("two", model_name="xtts"),
+                app.submit_synthesis("bad", model_name="xtts"),
+                return_exceptions=True,
+            )
+        finally:
+            worker.cancel()
+
+    one, two, bad = asyncio.run(run())
+
+    assert fake_engine == [(["one", "two", "bad"], {"model_name": "xtts"})]
+    assert (one.stem, two.stem) == ("one", "two")
+    assert isinstance(bad, RuntimeError)
+
+
+@pytest.fixture
+def audio_dir(monkeypatch, tmp_path):
+    """Point the app's output directory and audio LRU at an empty tmp directory."""
+    monkeypatch.setattr(app, "output_dir", tmp_path)
+    monkeypatch.setattr(app, "AUDIO_LRU", app.OrderedDict())
+    monkeypatch.setattr(app, "_audio_lru_bytes", 0)
+
+    def write(name, size):
+        path = tmp_path / name
+        path.write_bytes(b"\0" * size)
+        return str(path)
+
+    return write
+
+
+def test_audio_lru_evicts_oldest_but_never_the_newest(audio_dir, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, "AUDIO_CACHE_MAX_BYTES", 250)
+    for name in ["a.wav", "b.wav", "c.wav"]:
+        app._track_audio_file(audio_dir(name, 100), 100)
+    assert [Path(p).name for p in app.AUDIO_LRU] == ["b.wav", "c.wav"]
+
+    app._track_audio_file(audio_dir("big.wav", 1000), 1000)
+
+    assert [Path(p).name for p in app.AUDIO_LRU] == ["big.wav"]
+    assert app._audio_lru_bytes == 1000
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["big.wav"]
+
+
+def test_cleanup_drains_tracked_and_untracked_files(audio_dir, tmp_path):
+    app._track_audio_file(audio_dir("tracked.wav", 100), 100)
+    audio_dir("untracked.wav", 50)
+    audio_dir("notes.txt", 10)
+    (tmp_path / "cache").mkdir()
+
+    response = asyncio.run(app.cleanup_audio_files())
+
+    assert response["files_deleted"] == 2
+    assert response["bytes_freed"] == 150
+    assert not app.AUDIO_LRU and app._audio_lru_bytes == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cache", "notes.txt"]
+
+
+def _audio_generator(pieces, events):
+    """A blocking audio generator that records how far it got and whether it was closed."""
+    try:
+        for piece in pieces:
+            if isinstance(piece, Exception):
+                raise piece
+            events.append(piece)
+            yield piece
+    finally:
+        events.append("closed")
+
+
+def _consume(monkeypatch, iterator, take=None):
+    """Read up to `take` pieces through `_iterate_in_executor`, then close it; return (pieces, error)."""
+    async def run():
+        monkeypatch.setattr(app, "synthesis_slots", asyncio.Semaphore(1))
+        stream = app._iterate_in_executor(b"header", iterator)
+        pieces, error = [], None
+        try:
+            async for piece in stream:
+                pieces.append(piece)
+                if take is not None and len(pieces) == take:
+                    break
+        except Exception as e:
+            error = e
+        finally:
+            await stream.aclose()
+        # Wait for the close queued on the synthesis executor
+        await asyncio.get_running_loop().run_in_executor(app.SYNTH_EXECUTOR, lambda: None)
+        return pieces, error
+
+    return asyncio.run(run())
+
+
+def test_stream_stops_generating_and_closes_when_the_client_leaves(monkeypatch):
+    monkeypatch.setattr(app, "STREAM_PREFETCH_CHUNKS", 1)
+    events = []
+
+    pieces, error = _consume(monkeypatch, _audio_generator([b"a", b"b", b"c", b"d", b"e", b"f"], events), take=2)
+
+    assert pieces == [b"header", b"a"] and error is None
+    # Only the bounded prefetch ran ahead of the client before the generator was closed
+    assert events[-1] == "closed"
+    assert b"f" not in events
+
+
+def test_stream_raises_generator_errors_and_closes(monkeypatch):
+    events = []
+
+    pieces, error = _consume(monkeypatch, _audio_generator([b"a", RuntimeError("CUDA out of memory")], events))
+
+    assert pieces == [b"header", b"a"]
+    assert isinstance(error, RuntimeError)
+    assert events == [b"a", "closed"]
+
+
+def _request(accept_encoding=None):
+    headers = [] if accept_encoding is None else [(b"accept-encoding", accept_encoding.encode())]
+    return app.Request({"type": "http", "headers": headers})
+
+
+@pytest.mark.parametrize("accept_encoding, gzipped", [
+    (None, False),
+    ("", False),
+    ("gzip", True),
+    ("br, GZIP;q=0.8", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.000", False),
+    ("deflate, br", False),
+    ("gzip;q=0.5, identity", False),
+    ("gzip, identity;q=0.5", True),
+    ("x-gzip", True),
+    ("*", True),
+    ("*;q=0.5, identity", False),
+    ("gzip;q=0.5, *", False),
+])
+def test_cached_body_response_negotiates_gzip(accept_encoding, gzipped):
+    body = b"plain" * 300
+    compressed = app._gzip_body(body)
+
+    response = app._cached_body_response(_request(accept_encoding), body, compressed, "text/plain")
+
+    assert response.body == (compressed if gzipped else body)
+    assert response.headers.get("content-encoding") == ("gzip" if gzipped else None)
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_cached_body_response_sends_small_bodies_plain():
+    body = b"small"
+    assert app._gzip_body(body) is None
+
+    response = app._cached_body_response(_request("gzip"), body, None, "application/json")
+
+    assert response.body == body
+    assert "content-encoding" not in response.headers and "vary" not in response.headers
+
+
+def _stream_request(monkeypatch, pieces):
+    """Call the streaming endpoint over a fake engine stream; return its response or HTTPException."""
+    def synthesize_speech_stream(text, **kwargs):
+        for piece in pieces:
+            if isinstance(piece, Exception):
+                raise piece
+            yield piece
+
+    async def run():
+        monkeypatch.setattr(app, "synthesis_slots", asyncio.Semaphore(1))
+        try:
+            response = await app.synthesize_stream(app.TTSRequest(text="Olá."))
+        except app.HTTPException as e:
+            return e
+        return response, b"".join([piece async for piece in response.body_iterator])
+
+    monkeypatch.setattr(app, "synthesize_speech_stream", synthesize_speech_stream)
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("pieces, status_code", [
+    ([app.InvalidSpeakerError("speaker_idx must be between 0 and 1, got 5")], 400),
+    ([RuntimeError("model won't load")], 500),
+    ([b"header", RuntimeError("unsupported language")], 500),
+])
+def test_stream_reports_failures_before_the_first_audio_with_a_status(monkeypatch, pieces, status_code):
+    error = _stream_request(monkeypatch, pieces)
+
+    assert isinstance(error, app.HTTPException)
+    assert error.status_code == status_code
+
+
+def test_stream_sends_the_prefetched_audio_first(monkeypatch):
+    response, body = _stream_request(monkeypatch, [b"header", b"pcm1", b"pcm2"])
+
+    assert response.status_code == 200
+    assert body == b"headerpcm1pcm2"
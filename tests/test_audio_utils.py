@@ -0,0 +1,48 @@
+import sys
+import wave
+import struct
+from pathlib import Path
+
+# Ensure project root is on sys.path for module imports like `utils`
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from utils import get_wav_duration_seconds, wav_stream_header
+
+
+def _write_wav(path: Path, frames: bytes, framerate: int = 22050) -> str:
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(framerate)
+        wf.writeframes(frames)
+    return str(path)
+
+
+def test_get_wav_duration_seconds(tmp_path):
+    path = _write_wav(tmp_path / "a.wav", b"\x00\x00" * 22050)
+    assert get_wav_duration_seconds(path) == pytest.approx(1.0)
+    assert get_wav_duration_seconds(str(tmp_path / "missing.wav")) == 0.0
+
+
+def test_get_wav_duration_seconds_reads_past_extra_chunks_and_clamps_streamed_size(tmp_path):
+    raw = Path(_write_wav(tmp_path / "a.wav", b"\x00\x00" * 11025)).read_bytes()
+    extra = b"LIST" + struct.pack("<I", 4) + b"INFO"
+    listed = tmp_path / "listed.wav"
+    listed.write_bytes(raw[:36] + extra + raw[36:])
+    assert get_wav_duration_seconds(str(listed)) == pytest.approx(0.5)
+    # Streaming headers carry 0xFFFFFFFF as the data size
+    streamed = tmp_path / "streamed.wav"
+    streamed.write_bytes(wav_stream_header(22050) + b"\x00\x00" * 22050)
+    assert get_wav_duration_seconds(str(streamed)) == pytest.approx(1.0)
+
+
+def test_wav_stream_header_is_readable_pcm_header():
+    header = wav_stream_header(24000)
+    assert len(header) == 44
+    assert header[:4] == b"RIFF" and header[8:12] == b"WAVE" and header[36:40] == b"data"
+    channels, sample_rate, byte_rate, block_align, bits = struct.unpack_from("<HIIHH", header, 22)
+    assert (channels, sample_rate, byte_rate, block_align, bits) == (1, 24000, 48000, 2, 16)
+    assert struct.unpack_from("<I", header, 40)[0] == 0xFFFFFFFF
+
@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Ensure project root is on sys.path for module imports like `utils`
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+import utils
+from utils import get_available_models, partition_portuguese_models
+
+CATALOG = """ Name format: type/language/dataset/model
+ 1: tts_models/multilingual/multi-dataset/xtts_v2 [already downloaded]
+ 2: tts_models/en/ljspeech/tacotron2-DDC
+ 3: tts_models/pt/cv/vits
+"""
+
+
+@pytest.fixture(autouse=True)
+def _reset_models_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, "_models_cache", None)
+    monkeypatch.setattr(utils, "_models_lock", asyncio.Lock())
+    monkeypatch.setattr(utils, "MODELS_JSON", tmp_path / "models.json")
+
+
+def _fake_run(stdout, returncode=0):
+    async def run(cmd, timeout_seconds, env):
+        return returncode, stdout
+    return run
+
+
+def test_get_available_models_parses_catalog(monkeypatch):
+    monkeypatch.setattr(utils, "_run_list_models", _fake_run(CATALOG))
+    result = asyncio.run(get_available_models())
+    assert result.status == "ok"
+    assert result.text == CATALOG
+    assert [m["language"] for m in result.models] == ["multilingual", "en", "pt"]
+
+
+def test_get_available_models_reuses_persisted_catalog(monkeypatch):
+    monkeypatch.setattr(utils, "_run_list_models", _fake_run(CATALOG))
+    first = asyncio.run(get_available_models())
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("CLI should not run when models.json exists")
+
+    monkeypatch.setattr(utils, "_models_cache", None)
+    monkeypatch.setattr(utils, "_run_list_models", fail)
+    assert asyncio.run(get_available_models()) == first
+
+    utils.refresh_models_cache()
+    assert not utils.MODELS_JSON.exists()
+
+
+def test_expired_catalog_is_refetched_and_kept_when_cli_fails(monkeypatch):
+    monkeypatch.setattr(utils, "_run_list_models", _fake_run(CATALOG))
+    first = asyncio.run(get_available_models())
+    expired = time.time() - utils.MODELS_JSON_TTL_SECONDS - 60
+    os.utime(utils.MODELS_JSON, (expired, expired))
+
+    monkeypatch.setattr(utils, "_models_cache", None)
+    monkeypatch.setattr(utils, "_run_list_models", _fake_run("", returncode=1))
+    assert asyncio.run(get_available_models()) == first
+
+    newer = CATALOG + " 4: tts_models/en/vctk/vits\n"
+    monkeypatch.setattr(utils, "_models_cache", None)
+    monkeypatch.setattr(utils, "_run_list_models", _fake_run(newer))
+    assert asyncio.run(get_available_models()).text == newer
+
+
+def test_concurrent_callers_share_one_cli_run(monkeypatch):
+    calls = []
+
+    async def slow_run(cmd, timeout_seconds, env):
+        calls.append(cmd)
+        await asyncio.sleep(0.01)
+        return 0, CATALOG
+
+    monkeypatch.setattr(utils, "_run_list_models", slow_run)
+
+    async def fetch_all():
+        return await asyncio.gather(*(get_available_models() for _ in range(5)))
+
+    results = asyncio.run(fetch_all())
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+
+def test_get_available_models_flags_empty_output(monkeypatch):
+    monkeypatch.setattr(utils, "_run_list_models", _fake_run(""))
+    result = asyncio.run(get_available_models())
+    assert result.status == "warning"
+    assert "No models found" in result.text
+    assert result.models == []
+
+
+def test_partition_portuguese_models_keeps_catalog_order():
+    models = utils.parse_models_output(CATALOG + " 4: tts_models/pt-BR/custom/vits\n")
+    pt_models, multilingual_models = partition_portuguese_models(models)
+    assert [m["model_name"] for m in pt_models] == ["tts_models/pt/cv/vits", "tts_models/pt-BR/custom/vits"]
+    assert [m["language"] for m in multilingual_models] == ["multilingual"]
+
+
+def test_parse_models_output_skips_headers_and_keeps_suffixes():
+    raw = CATALOG + " Path: tts_models/en/ljspeech/vits\n 4: tts_models/short\n"
+    models = utils.parse_models_output(raw)
+    assert [m["model_name"] for m in models] == [
+        "tts_models/multilingual/multi-dataset/xtts_v2 [already downloaded]",
+        "tts_models/en/ljspeech/tacotron2-DDC",
+        "tts_models/pt/cv/vits",
+    ]
+    assert models[2]["full_line"] == "3: tts_models/pt/cv/vits"
+    assert models[2]["dataset"] == "cv"
+
+
+def test_refresh_waits_for_in_flight_fetch_and_keeps_new_listing(monkeypatch):
+    newer = CATALOG + " 4: tts_models/en/vctk/vits\n"
+    outputs = iter([CATALOG, newer])
+
+    async def slow_run(cmd, timeout_seconds, env):
+        stdout = next(outputs)
+        await asyncio.sleep(0.01)
+        return 0, stdout
+
+    monkeypatch.setattr(utils, "_run_list_models", slow_run)
+
+    async def fetch_then_refresh():
+        fetch = asyncio.create_task(get_available_models())
+        await asyncio.sleep(0)
+        refreshed = await utils.refresh_available_models()
+        return await fetch, refreshed
+
+    fetched, refreshed = asyncio.run(fetch_then_refresh())
+    assert fetched.text == CATALOG
+    assert refreshed.text == newer
+    assert asyncio.run(get_available_models()) is refreshed
@@ -6,7 +6,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 import pytest
 
-from utils import normalize_text, preprocess_pt_text, split_text_into_chunks
+from utils import normalize_and_count, normalize_text, preprocess_pt_text, split_text_into_chunks
 
 
 def test_normalize_text_quotes_and_spaces():
@@ -35,6 +35,13 @@ def test_preprocess_pt_text_preserves_sentences():
     assert "A Amazônia guardou o segredo até hoje" in pre
 
 
+def test_preprocess_pt_text_turns_ellipses_into_pauses():
+    assert preprocess_pt_text("Espere...2 minutos") == "Espere\n2 minutos"
+    assert preprocess_pt_text("Bem… talvez. Custa 12.50") == "Bem\n talvez\n Custa 12.50"
+    # No periods, ellipses or newlines: only spacing is cleaned up
+    assert preprocess_pt_text("  Olá,\tcomo\u00a0vai?  ") == "Olá, como vai?"
+
+
 def test_split_text_into_chunks_contains_critical_phrases():
     text = (
         "Um explorador inglês entrou na Amazônia em 1925 e nunca mais voltou. "
@@ -50,3 +57,9 @@ def test_split_text_into_chunks_contains_critical_phrases():
     assert "misteriosa de 'Z'" in combined
     assert "Cartões postais chegaram depois do sumiço, mas eram falsos" in combined
     assert "A Amazônia guardou o segredo até hoje" in combined
+
+
+def test_normalize_and_count_matches_separate_passes():
+    src = "Olá  “mundo”. O Sr. Silva pagou 12.34 reais…"
+    assert normalize_and_count(src) == (normalize_text(src), 9)
+    assert normalize_and_count(src, lang="pt") == (preprocess_pt_text(src), 9)
@@ -0,0 +1,309 @@
+import os
+import sys
+import wave
+from pathlib import Path
+from types import SimpleNamespace
+
+# Ensure project root is on sys.path for module imports like `tts_engine`
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+import tts_engine
+
+
+def test_synthesize_speech_batch_returns_failures_in_place(monkeypatch):
+    def fake_synthesize(text, *args):
+        if text == "bad":
+            raise RuntimeError("cannot say that")
+        return tts_engine.SynthResult(f"/tmp/{text}.wav", 1.0, 22050, text)
+
+    monkeypatch.setattr(tts_engine, "synthesize_speech", fake_synthesize)
+
+    first, failed, last = tts_engine.synthesize_speech_batch(["one", "bad", "two"])
+
+    assert first.stem == "one" and last.stem == "two"
+    assert isinstance(failed, RuntimeError)
+
+
+@pytest.mark.parametrize("speaker_idx", [-1, 2])
+def test_stream_rejects_out_of_range_speaker(monkeypatch, speaker_idx):
+    speakers = {"Ana": {}, "Bruno": {}}
+    xtts = SimpleNamespace(speaker_manager=SimpleNamespace(speakers=speakers))
+    model = SimpleNamespace(synthesizer=SimpleNamespace(tts_model=xtts, output_sample_rate=24000))
+    monkeypatch.setattr(tts_engine, "ensure_model_loaded", lambda *args: model)
+
+    stream = tts_engine.synthesize_speech_stream("Olá.", speaker_idx=speaker_idx)
+
+    with pytest.raises(tts_engine.InvalidSpeakerError, match="between 0 and 1"):
+        next(stream)
+
+
+def test_ensure_model_loaded_unloads_least_recently_used(monkeypatch):
+    class FakeTTS:
+        def __init__(self, name):
+            self.name = name
+
+        def to(self, device):
+            return self
+
+    fake_torch = SimpleNamespace(cuda=SimpleNamespace(is_available=lambda: False))
+    monkeypatch.setitem(sys.modules, "torch", fake_torch)
+    monkeypatch.setitem(sys.modules, "TTS", SimpleNamespace())
+    monkeypatch.setitem(sys.modules, "TTS.api", SimpleNamespace(TTS=FakeTTS))
+    monkeypatch.setattr(tts_engine, "_MODEL_REGISTRY", tts_engine.OrderedDict())
+    monkeypatch.setattr(tts_engine, "MAX_LOADED_MODELS", 2)
+
+    for name in ["a", "b", "a", "c"]:
+        assert tts_engine.ensure_model_loaded(name).name == name
+
+    assert list(tts_engine._MODEL_REGISTRY) == ["a", "c"]
+
+
+@pytest.fixture
+def wav_cache(monkeypatch, tmp_path):
+    """Point the WAV cache at a fresh tmp directory with an empty index."""
+    np = pytest.importorskip("numpy")
+    cache_dir = tmp_path / "cache"
+    staging_dir = tmp_path / "staging"
+    cache_dir.mkdir()
+    staging_dir.mkdir()
+    monkeypatch.setattr(tts_engine, "CACHE_DIR", cache_dir)
+    monkeypatch.setattr(tts_engine, "_CACHE_DIR_STR", str(cache_dir))
+    monkeypatch.setattr(tts_engine, "_STAGING_DIR_STR", str(staging_dir))
+    monkeypatch.setattr(tts_engine, "_WAV_CACHE", tts_engine.OrderedDict())
+    monkeypatch.setattr(tts_engine, "_WAV_CACHE_SIZES", {})
+    monkeypatch.setattr(tts_engine, "_wav_cache_bytes", 0)
+    monkeypatch.setattr(tts_engine, "WAV_CACHE_MAX_ENTRIES", 8)
+    monkeypatch.setattr(tts_engine, "WAV_CACHE_MAX_BYTES", 0)
+
+    def put(key, samples):
+        tts_engine._wav_cache_put_pcm(key, np.zeros(samples, dtype=np.int16), 22050)
+        return cache_dir / f"{key}.wav"
+
+    return put
+
+
+def _cache_bytes_on_disk():
+    return sum(p.stat().st_size for p in tts_engine.CACHE_DIR.glob("*.wav"))
+
+
+def test_wav_cache_evicts_least_recently_used_over_entry_cap(wav_cache, monkeypatch):
+    monkeypatch.setattr(tts_engine, "WAV_CACHE_MAX_ENTRIES", 2)
+    wav_cache("a", 10)
+    b = wav_cache("b", 10)
+    assert tts_engine._wav_cache_read_pcm("a") is not None  # a is now the most recently used
+    wav_cache("c", 10)
+
+    assert list(tts_engine._WAV_CACHE) == ["a", "c"]
+    assert not b.exists()
+    assert tts_engine._wav_cache_bytes == _cache_bytes_on_disk()
+
+
+def test_wav_cache_byte_cap_keeps_newest_entry(wav_cache, monkeypatch):
+    # Each entry is a 44-byte header plus 2 bytes per sample
+    monkeypatch.setattr(tts_engine, "WAV_CACHE_MAX_BYTES", 2 * (44 + 200))
+    wav_cache("a", 100)
+    wav_cache("b", 100)
+    wav_cache("c", 100)
+    assert list(tts_engine._WAV_CACHE) == ["b", "c"]
+
+    wav_cache("big", 1000)
+    assert list(tts_engine._WAV_CACHE) == ["big"]
+    assert tts_engine._wav_cache_bytes == _cache_bytes_on_disk() == 44 + 2000
+
+
+def test_wav_cache_byte_accounting_after_overwrite_and_forget(wav_cache):
+    wav_cache("a", 100)
+    wav_cache("b", 10)
+    wav_cache("a", 50)
+    assert tts_engine._wav_cache_bytes == (44 + 100) + (44 + 20) == _cache_bytes_on_disk()
+
+    tts_engine._wav_cache_forget("a")
+    tts_engine._wav_cache_forget("a")
+    assert tts_engine._wav_cache_bytes == 44 + 20
+    assert list(tts_engine._WAV_CACHE) == ["b"]
+
+
+def test_load_wav_cache_reindexes_oldest_first_and_trims(wav_cache, monkeypatch):
+    for age, key in enumerate(["new", "mid", "old"]):
+        path = wav_cache(key, 10 * (age + 1))
+        os.utime(path, (1000 - age, 1000 - age))
+    (tts_engine.CACHE_DIR / "broken.wav").write_bytes(b"not a wav")
+    monkeypatch.setattr(tts_engine, "_WAV_CACHE", tts_engine.OrderedDict())
+    monkeypatch.setattr(tts_engine, "_WAV_CACHE_SIZES", {})
+    monkeypatch.setattr(tts_engine, "_wav_cache_bytes", 0)
+    monkeypatch.setattr(tts_engine, "WAV_CACHE_MAX_ENTRIES", 2)
+
+    tts_engine._load_wav_cache()
+
+    assert list(tts_engine._WAV_CACHE) == ["mid", "new"]
+    assert tts_engine._WAV_CACHE["new"].duration_s == pytest.approx(10 / 22050)
+    assert sorted(p.name for p in tts_engine.CACHE_DIR.glob("*.wav")) == ["mid.wav", "new.wav"]
+    assert tts_engine._wav_cache_bytes == _cache_bytes_on_disk()
+
+
+XTTS_CONFIG = SimpleNamespace(
+    gpt_cond_len=30, gpt_cond_chunk_len=4, max_ref_len=10, sound_norm_refs=False,
+    temperature=0.7, length_penalty=1.0, repetition_penalty=5.0, top_k=50, top_p=0.8,
+)
+
+
+def test_speaker_latents_are_memoized_by_contents_but_failures_are_not(monkeypatch, tmp_path):
+    monkeypatch.setattr(tts_engine, "_SPEAKER_LATENTS", {})
+    calls = []
+
+    def get_conditioning_latents(audio_path, **settings):
+        calls.append(audio_path)
+        if len(calls) == 1:
+            raise RuntimeError("CUDA busy")
+        assert settings == {"gpt_cond_len": 30, "gpt_cond_chunk_len": 4, "max_ref_length": 10, "sound_norm_refs": False}
+        return ("gpt", "embedding")
+
+    xtts = SimpleNamespace(config=XTTS_CONFIG, get_conditioning_latents=get_conditioning_latents)
+    model = SimpleNamespace(synthesizer=SimpleNamespace(tts_model=xtts))
+    voice = tmp_path / "voice.wav"
+    voice.write_bytes(b"RIFF voice")
+    copy = tmp_path / "copy.wav"
+    copy.write_bytes(b"RIFF voice")
+
+    with pytest.raises(RuntimeError):
+        tts_engine._speaker_latents_locked(model, str(voice))
+    assert tts_engine._speaker_latents_locked(model, str(voice)) == ("gpt", "embedding")
+    assert tts_engine._speaker_latents_locked(model, str(copy)) == ("gpt", "embedding")
+    assert len(calls) == 2
+
+
+def test_tts_cli_command_lists_flags_then_use_cuda():
+    args = {"--text": "Olá", "--out_path": "/tmp/x.wav", "--language_idx": "pt"}
+    assert tts_engine._tts_cli_command(args) == [
+        "tts", "--text", "Olá", "--out_path", "/tmp/x.wav", "--language_idx", "pt", "--use_cuda",
+    ]
+
+
+def test_cli_chunk_retries_xtts_pt_br_as_pt(monkeypatch, tmp_path):
+    monkeypatch.setattr(tts_engine, "_STAGING_DIR_STR", str(tmp_path))
+    monkeypatch.setattr(tts_engine, "_OUTPUT_DIR_STR", str(tmp_path))
+    commands = []
+
+    def run(cmd, timeout_seconds):
+        commands.append(cmd)
+        if cmd[cmd.index("--language_idx") + 1] == "pt-br":
+            return SimpleNamespace(returncode=1, stdout="", stderr="unsupported language")
+        with wave.open(cmd[cmd.index("--out_path") + 1], "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(24000)
+            wf.writeframes(b"\x00\x00" * 2400)
+        return SimpleNamespace(returncode=0, stdout="", stderr="")
+
+    monkeypatch.setattr(tts_engine, "_run_tts_command", run)
+
+    result = tts_engine._synthesize_chunk_cli(
+        "pt-br", tts_engine.XTTS_MODEL_NAME, language_idx="pt-br", speaker_wav="/voice.wav"
+    )
+
+    assert result.duration_s == pytest.approx(0.1)
+    first, retry = commands
+    assert first[first.index("--language_idx") + 1] == "pt-br"
+    assert retry[retry.index("--language_idx") + 1] == "pt"
+    # Only the flag changes on retry; the text itself is left alone
+    assert retry[retry.index("--text") + 1] == "pt-br"
+    assert retry[retry.index("--speaker_wav") + 1] == "/voice.wav"
+    assert retry[-1] == "--use_cuda" and "--speaker_idx" not in retry
+
+
+def test_cli_chunk_defaults_xtts_speaker_and_language(monkeypatch, tmp_path):
+    monkeypatch.setattr(tts_engine, "_STAGING_DIR_STR", str(tmp_path))
+    monkeypatch.setattr(tts_engine, "_OUTPUT_DIR_STR", str(tmp_path))
+    commands = []
+
+    def run(cmd, timeout_seconds):
+        commands.append(cmd)
+        return SimpleNamespace(returncode=1, stdout="", stderr="failed")
+
+    monkeypatch.setattr(tts_engine, "_run_tts_command", run)
+
+    with pytest.raises(Exception, match="TTS command failed"):
+        tts_engine._synthesize_chunk_cli("Hello", tts_engine.XTTS_MODEL_NAME)
+
+    (cmd,) = commands  # no pt-br, so no retry
+    assert cmd[cmd.index("--speaker_idx") + 1] == tts_engine.XTTS_DEFAULT_SPEAKER
+    assert cmd[cmd.index("--language_idx") + 1] == "en"
+
+
+def test_clear_stale_staging_skips_directories_and_unremovable_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(tts_engine, "STAGING_DIR", tmp_path)
+    monkeypatch.setattr(tts_engine, "SCRATCH_DIR", tmp_path)
+    for name in ["old.wav", "locked.wav", "new.wav"]:
+        (tmp_path / name).write_bytes(b"RIFF")
+    (tmp_path / "subdir").mkdir()
+    for name in ["old.wav", "locked.wav", "subdir"]:
+        os.utime(tmp_path / name, (0, 0))
+    real_unlink = os.unlink
+
+    def unlink(path):
+        if path.endswith("locked.wav"):
+            raise PermissionError(13, "Permission denied", path)
+        real_unlink(path)
+
+    monkeypatch.setattr(tts_engine.os, "unlink", unlink)
+
+    tts_engine._clear_stale_staging()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["locked.wav", "new.wav", "subdir"]
+
+
+def test_clone_inference_uses_config_sampling_and_splits_sentences(monkeypatch, tmp_path):
+    np = pytest.importorskip("numpy")
+    monkeypatch.setattr(tts_engine, "_SPEAKER_LATENTS", {})
+    voice = tmp_path / "voice.wav"
+    voice.write_bytes(b"RIFF voice")
+    calls = []
+
+    def inference(text, language, gpt_cond_latent, speaker_embedding, **settings):
+        calls.append((text, language, gpt_cond_latent, settings))
+        return {"wav": np.zeros(10, dtype=np.float16)}
+
+    xtts = SimpleNamespace(
+        config=XTTS_CONFIG, inference=inference, get_conditioning_latents=lambda **kw: ("gpt", "embedding")
+    )
+    model = SimpleNamespace(
+        synthesizer=SimpleNamespace(tts_model=xtts),
+        is_multi_speaker=True, speakers=["Ana"], is_multi_lingual=True, languages=["en", "pt"],
+    )
+
+    wav = tts_engine._run_inference(model, tts_engine.XTTS_MODEL_NAME, "Olá.", language_idx="pt-br", speaker_wav=str(voice))
+
+    assert wav.dtype == np.float32
+    assert calls == [("Olá.", "pt", "gpt", {
+        "enable_text_splitting": True,
+        "temperature": 0.7, "length_penalty": 1.0, "repetition_penalty": 5.0, "top_k": 50, "top_p": 0.8,
+    })]
+
+
+def test_stream_maps_pt_br_and_uses_config_sampling(monkeypatch):
+    np = pytest.importorskip("numpy")
+    calls = []
+
+    def inference_stream(text, language, gpt_cond_latent, speaker_embedding, **settings):
+        calls.append((language, gpt_cond_latent, settings))
+        yield np.zeros(4, dtype=np.float32)
+
+    speakers = {tts_engine.XTTS_DEFAULT_SPEAKER: {"gpt_cond_latent": "gpt", "speaker_embedding": "embedding"}}
+    xtts = SimpleNamespace(
+        config=XTTS_CONFIG, inference_stream=inference_stream, speaker_manager=SimpleNamespace(speakers=speakers)
+    )
+    model = SimpleNamespace(
+        synthesizer=SimpleNamespace(tts_model=xtts, output_sample_rate=24000),
+        is_multi_speaker=True, speakers=list(speakers), is_multi_lingual=True, languages=["en", "pt"],
+    )
+    monkeypatch.setattr(tts_engine, "ensure_model_loaded", lambda *args: model)
+
+    header, pcm = tts_engine.synthesize_speech_stream("Olá.", language_idx="pt-br")
+
+    assert len(header) == 44 and pcm == b"\x00\x00" * 4
+    assert calls == [("pt", "gpt", {
+        "enable_text_splitting": True,
+        "temperature": 0.7, "length_penalty": 1.0, "repetition_penalty": 5.0, "top_k": 50, "top_p": 0.8,
+    })]
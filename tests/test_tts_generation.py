@@ -1,5 +1,6 @@
 import os
 import sys
+import wave
 import shutil
 import subprocess
 from pathlib import Path
@@ -7,7 +8,7 @@ from tempfile import TemporaryDirectory
 
 import pytest
 
-from utils import preprocess_pt_text, split_text_into_chunks, concatenate_wav_files
+from utils import preprocess_pt_text, split_text_into_chunks
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 MODELS_DIR = PROJECT_ROOT / "models"
@@ -92,8 +93,13 @@ def test_generate_audio_xtts_clone_voice_cli():
             assert chunk_out.stat().st_size > 1000, f"Chunk WAV too small: {chunk_out}"
             chunk_wavs.append(str(chunk_out))
 
-        # 4) Concatenate into final_out (same utility as app uses)
-        concatenate_wav_files(chunk_wavs, str(final_out))
+        # 4) Concatenate the chunks' frames into final_out
+        with wave.open(str(final_out), "wb") as out:
+            for i, chunk_wav in enumerate(chunk_wavs):
+                with wave.open(chunk_wav, "rb") as wf:
+                    if i == 0:
+                        out.setparams(wf.getparams())
+                    out.writeframes(wf.readframes(wf.getnframes()))
 
     assert final_out.exists(), "Final output WAV not created"
     assert final_out.stat().st_size > 1000, "Final output WAV too small"
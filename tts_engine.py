@@ -1,11 +1,20 @@
+import gc
 import os
-import uuid
+import mmap
+import time
+import wave
+import shutil
+import hashlib
 import logging
+import threading
 import subprocess
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
 
-from utils import split_text_into_chunks, concatenate_wav_files
+from utils import TTS_ENV, next_file_id, split_text_into_chunks, wav_duration_and_rate, wav_stream_header
 
 logger = logging.getLogger(__name__)
 
@@ -13,20 +22,562 @@ logger = logging.getLogger(__name__)
 OUTPUT_DIR = Path("/app/output")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+XTTS_MODEL_NAME = "tts_models/multilingual/multi-dataset/xtts_v2"
+XTTS_DEFAULT_SPEAKER = "Aaron Dreschner"
+# Settings from the XTTS model config that `model.tts` uses for sampling
+XTTS_SAMPLING_SETTINGS = ("temperature", "length_penalty", "repetition_penalty", "top_k", "top_p")
+# Texts longer than this are split into chunks before synthesis; voice cloning (XTTS) is more
+# sensitive to long inputs, so it gets shorter chunks
+CHUNK_LENGTH = 500
+CLONE_CHUNK_LENGTH = 300
+# XTTS is fed at most this many characters per inference_stream call when streaming
+STREAM_CHUNK_LENGTH = 250
+# Models without incremental inference are streamed chunk by chunk in slices of this size
+STREAM_SLICE_BYTES = 16 * 1024
+
+
+class InvalidSpeakerError(ValueError):
+    """Raised when a request names a speaker the model doesn't have."""
+
+
+class SynthResult(NamedTuple):
+    """A synthesized WAV file together with the metadata the API reports for it."""
+    path: str
+    duration_s: float
+    sample_rate: int
+    stem: str  # file name without the .wav extension
+
+
+# In-process TTS instances by model name, least recently used first, loaded by
+# ensure_model_loaded (at startup or on first use). At most MAX_LOADED_MODELS are registered:
+# loading another one unloads the least recently used, so arbitrary model names sent by
+# clients can't pile up in VRAM. This is a soft cap: an unloaded instance a request still holds
+# stays in memory until that request finishes. The `tts` CLI is only used when a model can't be
+# loaded here.
+MAX_LOADED_MODELS = max(1, int(os.getenv("MAX_LOADED_MODELS", "3")))
+_MODEL_REGISTRY: "OrderedDict[str, Any]" = OrderedDict()
+_MODEL_LOCK = threading.Lock()
+# One inference lock per model name: chunks of a request run in parallel, but a model
+# instance is never driven by two threads at once. Kept when a model is unloaded, so a
+# thread still finishing on the old instance and a reloaded one share the same lock.
+_INFERENCE_LOCKS: Dict[str, threading.Lock] = {}
+# Models that failed to load in-process, by name: monotonic time of the failure. Until
+# MODEL_LOAD_RETRY_SECONDS have passed they go straight to the `tts` CLI instead of paying
+# for another import and load attempt on every chunk.
+_MODEL_LOAD_FAILURES: Dict[str, float] = {}
+MODEL_LOAD_RETRY_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_SECONDS", "300"))
+# Optional mixed-precision inference on CUDA: "fp16" or "bf16" (Ampere and newer). Off by
+# default, since reduced precision can audibly change some models' output.
+AUTOCAST_DTYPES = {"fp16": "float16", "bf16": "bfloat16"}
+TTS_AUTOCAST = os.getenv("TTS_AUTOCAST", "").strip().lower()
+if TTS_AUTOCAST and TTS_AUTOCAST not in AUTOCAST_DTYPES:
+    logger.warning("Ignoring unknown TTS_AUTOCAST=%r (expected one of %s)", TTS_AUTOCAST, ", ".join(AUTOCAST_DTYPES))
+    TTS_AUTOCAST = ""
+
+# Chunks of a multi-chunk synthesis that go through the `tts` CLI are dispatched to this pool
+# and run as parallel subprocesses; in-process models take a request's chunks as one job.
+CHUNK_WORKERS = int(os.getenv("TTS_CHUNK_WORKERS", "4"))
+_CHUNK_EXECUTOR = ThreadPoolExecutor(max_workers=CHUNK_WORKERS, thread_name_prefix="tts-chunk")
+# Each `tts` CLI run loads its own copy of the model, so the number running at once is capped
+# separately (TTS_CONCURRENCY, default CHUNK_WORKERS) to fit the available VRAM/CPU.
+TTS_CONCURRENCY = max(1, int(os.getenv("TTS_CONCURRENCY", str(CHUNK_WORKERS))))
+_CLI_SLOTS = threading.BoundedSemaphore(TTS_CONCURRENCY)
+
+
+# WAVs are written here first and renamed into OUTPUT_DIR once complete, so the output
+# directory (and anything scanning it) only ever sees finished files. Same filesystem as
+# OUTPUT_DIR, so the rename is atomic; it's skipped by the output scans like CACHE_DIR.
+STAGING_DIR = OUTPUT_DIR / ".staging"
+STAGING_DIR.mkdir(parents=True, exist_ok=True)
+# Chunk WAVs from the `tts` CLI that are only read back into memory are written here instead;
+# tmpfs by default, so they never reach the disk. Falls back to STAGING_DIR if it can't be created.
+SCRATCH_DIR = Path(os.getenv("TTS_SCRATCH_DIR", "/dev/shm/coquitts"))
+try:
+    SCRATCH_DIR.mkdir(parents=True, exist_ok=True)
+except OSError as e:
+    logger.warning("Scratch directory %s unavailable (%s); using %s", SCRATCH_DIR, e, STAGING_DIR)
+    SCRATCH_DIR = STAGING_DIR
+# Per-file paths are built by string formatting from these instead of Path arithmetic
+_OUTPUT_DIR_STR = str(OUTPUT_DIR)
+_STAGING_DIR_STR = str(STAGING_DIR)
+_SCRATCH_DIR_STR = str(SCRATCH_DIR)
+
+# Synthesized WAVs by input hash, so repeated phrases are served without running the model.
+# Entries live under CACHE_DIR and are hardlinked into OUTPUT_DIR for each caller, which keeps
+# them safe from the output directory's own eviction and cleanup.
+CACHE_DIR = OUTPUT_DIR / "cache"
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+_CACHE_DIR_STR = str(CACHE_DIR)
+WAV_CACHE_MAX_ENTRIES = int(os.getenv("WAV_CACHE_MAX_ENTRIES", "512"))
+# Total size cap for the cache files; 0 disables it and leaves only the entry cap
+WAV_CACHE_MAX_BYTES = int(os.getenv("WAV_CACHE_MAX_BYTES", str(1024 ** 3)))
+_WAV_CACHE: "OrderedDict[str, SynthResult]" = OrderedDict()
+# File size of each entry and their total, maintained under _WAV_CACHE_LOCK alongside _WAV_CACHE
+_WAV_CACHE_SIZES: Dict[str, int] = {}
+_wav_cache_bytes = 0
+_WAV_CACHE_LOCK = threading.Lock()
+# Content digests of reference WAVs by path: (mtime_ns, size, digest)
+_SPEAKER_WAV_DIGESTS: Dict[str, Tuple[int, int, bytes]] = {}
+# XTTS conditioning latents by reference WAV digest, so a voice is encoded once however it is
+# referenced; filled under the XTTS inference lock
+_SPEAKER_LATENTS: Dict[bytes, Tuple[Any, Any]] = {}
+
+
+def _speaker_wav_digest(path: str) -> bytes:
+    """Hash a reference WAV's contents, rereading it only when its mtime or size changes."""
+    st = os.stat(path)
+    cached = _SPEAKER_WAV_DIGESTS.get(path)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if st.st_size:
+            # Hash straight from the page cache instead of copying the file into a bytes object
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                digest = hashlib.blake2b(data, digest_size=16).digest()
+        else:
+            digest = hashlib.blake2b(b"", digest_size=16).digest()
+    _SPEAKER_WAV_DIGESTS[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+def _wav_cache_key(
+    text: str,
+    model_name: Optional[str],
+    speaker_idx: Optional[int],
+    language_idx: Optional[str],
+    speaker_wav: Optional[str],
+    speaker_wav_digest: Optional[bytes] = None,
+) -> Optional[str]:
+    """Return the cache key for a synthesis, or None if it can't be cached.
+
+    The reference voice is keyed by its WAV contents. Callers keying several chunks pass
+    `speaker_wav_digest` from `_speaker_wav_digest` so the reference isn't looked up per chunk.
+    """
+    h = hashlib.blake2b(f"{model_name}|{speaker_idx}|{language_idx}|{text}".encode(), digest_size=16)
+    if speaker_wav is not None:
+        if speaker_wav_digest is None:
+            try:
+                speaker_wav_digest = _speaker_wav_digest(speaker_wav)
+            except OSError:
+                return None
+        h.update(speaker_wav_digest)
+    return h.hexdigest()
+
+
+def _clear_stale_staging(max_age_seconds: float = 3600) -> None:
+    """Remove staging and scratch files abandoned by a crashed run (other workers may still be writing newer ones)."""
+    cutoff = time.time() - max_age_seconds
+    for directory in {STAGING_DIR, SCRATCH_DIR}:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    logger.warning("Could not remove stale file %s: %s", entry.path, e)
+
+
+def _staged_output(file_id: str) -> Tuple[str, str]:
+    """Return (staging path, final OUTPUT_DIR path) for a new output file."""
+    return f"{_STAGING_DIR_STR}/{file_id}.wav", f"{_OUTPUT_DIR_STR}/{file_id}.wav"
+
+
+def _remove(path: str) -> None:
+    """Delete a file if it is still there (a single unlink, no existence check first)."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _link_into_output(src: str) -> Tuple[str, str]:
+    """Hardlink (or copy, across filesystems) a WAV to a fresh OUTPUT_DIR path; return (path, stem)."""
+    file_id = next_file_id()
+    dst = f"{_OUTPUT_DIR_STR}/{file_id}.wav"
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+    return dst, file_id
+
+
+def _wav_cache_entry(key: Optional[str]) -> Optional[SynthResult]:
+    """Return the cache entry for `key` (its path points into CACHE_DIR), marking it recently used."""
+    if key is None:
+        return None
+    with _WAV_CACHE_LOCK:
+        cached = _WAV_CACHE.get(key)
+        if cached is not None:
+            _WAV_CACHE.move_to_end(key)
+        return cached
+
+
+def _wav_cache_get(key: Optional[str]) -> Optional[SynthResult]:
+    """Return a private copy of the cached WAV for `key`, or None on a miss."""
+    cached = _wav_cache_entry(key)
+    if cached is None:
+        return None
+    try:
+        path, stem = _link_into_output(cached.path)
+    except OSError:
+        # The cache file went missing; forget it and synthesize again
+        _wav_cache_forget(key)
+        return None
+    logger.debug("WAV cache hit: %s", key)
+    return cached._replace(path=path, stem=stem)
+
+
+def _wav_cache_forget(key: str) -> None:
+    """Drop `key` from the index (its file is already gone or unreadable)."""
+    global _wav_cache_bytes
+    with _WAV_CACHE_LOCK:
+        if _WAV_CACHE.pop(key, None) is not None:
+            _wav_cache_bytes -= _WAV_CACHE_SIZES.pop(key, 0)
+
+
+def _wav_cache_evict_locked() -> List[SynthResult]:
+    """Pop the oldest entries while over the entry or byte cap; callers hold _WAV_CACHE_LOCK.
+
+    The newest entry is always kept, even if it alone exceeds the byte cap.
+    """
+    global _wav_cache_bytes
+    evicted: List[SynthResult] = []
+    while _WAV_CACHE and (
+        len(_WAV_CACHE) > WAV_CACHE_MAX_ENTRIES
+        or (len(_WAV_CACHE) > 1 and 0 < WAV_CACHE_MAX_BYTES < _wav_cache_bytes)
+    ):
+        old_key, old = _WAV_CACHE.popitem(last=False)
+        _wav_cache_bytes -= _WAV_CACHE_SIZES.pop(old_key, 0)
+        evicted.append(old)
+    return evicted
+
+
+def _wav_cache_read_pcm(key: Optional[str]) -> Optional[Tuple[Any, int]]:
+    """Return the cached audio for `key` as (int16 samples, sample_rate), or None on a miss."""
+    cached = _wav_cache_entry(key)
+    if cached is None:
+        return None
+    try:
+        return _read_pcm16(cached.path)
+    except (OSError, wave.Error, EOFError):
+        _wav_cache_forget(key)
+        return None
+
+
+def _wav_cache_insert(key: str, entry: SynthResult, size: int) -> None:
+    """Record a file of `size` bytes already placed in CACHE_DIR, evicting the oldest entries over the caps."""
+    global _wav_cache_bytes
+    with _WAV_CACHE_LOCK:
+        _wav_cache_bytes += size - _WAV_CACHE_SIZES.get(key, 0)
+        _WAV_CACHE_SIZES[key] = size
+        _WAV_CACHE[key] = entry
+        _WAV_CACHE.move_to_end(key)
+        evicted = _wav_cache_evict_locked()
+    for old in evicted:
+        _remove(old.path)
+
+
+def _wav_cache_put(key: Optional[str], result: SynthResult) -> None:
+    """Keep a hardlink to a freshly synthesized WAV under `key`, evicting the oldest entries."""
+    if key is None or WAV_CACHE_MAX_ENTRIES <= 0:
+        return
+    cache_path = f"{_CACHE_DIR_STR}/{key}.wav"
+    try:
+        os.link(result.path, cache_path)
+    except FileExistsError:
+        pass
+    except OSError:
+        try:
+            shutil.copyfile(result.path, cache_path)
+        except OSError as e:
+            logger.warning("Could not cache %s: %s", result.path, e)
+            return
+    _wav_cache_insert(key, result._replace(path=cache_path, stem=key), os.path.getsize(cache_path))
+
+
+def _wav_cache_put_pcm(key: Optional[str], pcm: Any, sample_rate: int) -> None:
+    """Write in-memory samples straight into the cache under `key`."""
+    if key is None or WAV_CACHE_MAX_ENTRIES <= 0:
+        return
+    cache_path = f"{_CACHE_DIR_STR}/{key}.wav"
+    tmp_path = f"{_STAGING_DIR_STR}/{next_file_id()}.wav"
+    try:
+        _write_pcm16(tmp_path, pcm, sample_rate)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        _remove(tmp_path)
+        logger.warning("Could not cache chunk %s: %s", key, e)
+        return
+    # _write_pcm16 writes a 44-byte header followed by the raw samples
+    _wav_cache_insert(
+        key, SynthResult(cache_path, len(pcm) / float(sample_rate), sample_rate, key), 44 + pcm.nbytes
+    )
+
+
+def _load_wav_cache() -> None:
+    """Index WAVs cached by a previous run, oldest first, trimming to the entry and byte caps."""
+    global _wav_cache_bytes
+    try:
+        entries = [(p.stat(), p) for p in CACHE_DIR.glob("*.wav")]
+    except OSError:
+        return
+    entries.sort(key=lambda e: e[0].st_mtime)
+    for st, p in entries:
+        try:
+            result = _wav_result(str(p), p.stem)
+        except (OSError, wave.Error, EOFError):
+            p.unlink(missing_ok=True)
+            continue
+        _WAV_CACHE[p.stem] = result
+        _WAV_CACHE_SIZES[p.stem] = st.st_size
+        _wav_cache_bytes += st.st_size
+    with _WAV_CACHE_LOCK:
+        evicted = _wav_cache_evict_locked()
+    for old in evicted:
+        _remove(old.path)
+
 
 def _run_tts_command(cmd_list, timeout_seconds: int):
     """Run TTS command directly since 'tts' is available in the container."""
-    env = os.environ.copy()
-    env["TTS_HOME"] = "/app/models"
-
     # Use the command as-is since 'tts' is available directly
-    return subprocess.run(
-        cmd_list,
-        capture_output=True,
-        text=True,
-        timeout=timeout_seconds,
-        env=env,
-    )
+    with _CLI_SLOTS:
+        return subprocess.run(
+            cmd_list,
+            capture_output=True,
+            text=True,
+            timeout=timeout_seconds,
+            env=TTS_ENV,
+        )
+
+
+def _tts_cli_command(args: Dict[str, str]) -> List[str]:
+    """Build a `tts` command line from valued flags, preferring the GPU when available."""
+    cmd = ["tts"]
+    for flag, value in args.items():
+        cmd += (flag, value)
+    cmd.append("--use_cuda")  # boolean flag, no value
+    return cmd
+
+
+def _wav_result(path: str, stem: str) -> SynthResult:
+    """Build a SynthResult by reading the header of a WAV file written by the `tts` CLI."""
+    duration, sample_rate = wav_duration_and_rate(path)
+    return SynthResult(path, duration, sample_rate, stem)
+
+
+_load_wav_cache()
+_clear_stale_staging()
+
+
+def ensure_model_loaded(model_name: str = XTTS_MODEL_NAME):
+    """Load the in-process TTS model for `model_name` if it isn't loaded yet and return it.
+
+    Loading a model while MAX_LOADED_MODELS are resident first unloads the least recently used one.
+    """
+    model = _MODEL_REGISTRY.get(model_name)
+    if model is not None:
+        try:
+            _MODEL_REGISTRY.move_to_end(model_name)
+        except KeyError:
+            pass  # unloaded meanwhile; this caller still finishes on the instance it got
+        return model
+    with _MODEL_LOCK:
+        model = _MODEL_REGISTRY.get(model_name)
+        if model is not None:
+            return model
+        os.environ.setdefault("TTS_HOME", "/app/models")
+        import torch
+        from TTS.api import TTS
+
+        if len(_MODEL_REGISTRY) >= MAX_LOADED_MODELS:
+            _unload_least_recent_models_locked(torch)
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        logger.info("Loading %s in-process on %s", model_name, device)
+        model = TTS(model_name).to(device)
+        _INFERENCE_LOCKS.setdefault(model_name, threading.Lock())
+        _MODEL_REGISTRY[model_name] = model
+    return model
+
+
+def _unload_least_recent_models_locked(torch: Any) -> None:
+    """Drop models until one more fits under MAX_LOADED_MODELS and free their VRAM; callers hold _MODEL_LOCK."""
+    while len(_MODEL_REGISTRY) >= MAX_LOADED_MODELS:
+        old_name, _ = _MODEL_REGISTRY.popitem(last=False)
+        logger.info("Unloading %s to stay within MAX_LOADED_MODELS=%d", old_name, MAX_LOADED_MODELS)
+    # Model objects can hold reference cycles; collect them before returning the blocks to the driver
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+@contextmanager
+def _model_inference(model_name: str) -> Iterator[None]:
+    """Hold `model_name`'s inference lock with autograd off and, if TTS_AUTOCAST is set, CUDA autocast on."""
+    import torch
+
+    with _INFERENCE_LOCKS[model_name], ExitStack() as stack:
+        stack.enter_context(torch.inference_mode())
+        if TTS_AUTOCAST and torch.cuda.is_available():
+            stack.enter_context(torch.autocast("cuda", dtype=getattr(torch, AUTOCAST_DTYPES[TTS_AUTOCAST])))
+        yield
+
+
+def warm_model(model_name: str = XTTS_MODEL_NAME) -> None:
+    """Load a model and run a throwaway synthesis so CUDA kernels and cuDNN autotuning happen now."""
+    model = ensure_model_loaded(model_name)
+    kwargs = _tts_kwargs(model, model_name)
+    with _model_inference(model_name):
+        model.tts(text="Olá.", **kwargs)
+
+
+def release_gpu_cache() -> None:
+    """Hand cached CUDA blocks back to the driver; a no-op until a model is loaded in-process."""
+    if not _MODEL_REGISTRY:
+        return
+    import torch
+
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def compute_speaker_latents(speaker_wav: str) -> Tuple[Any, Any]:
+    """Compute the XTTS (gpt_cond_latent, speaker_embedding) pair for a reference WAV."""
+    model = ensure_model_loaded()
+    with _model_inference(XTTS_MODEL_NAME):
+        return _speaker_latents_locked(model, speaker_wav)
+
+
+def _speaker_latents_locked(model: Any, speaker_wav: str) -> Tuple[Any, Any]:
+    """Return the XTTS latents for a reference WAV, memoized by its contents; callers hold `_model_inference`."""
+    digest = _speaker_wav_digest(speaker_wav)
+    latents = _SPEAKER_LATENTS.get(digest)
+    if latents is None:
+        logger.info("Computing XTTS speaker latents for %s", speaker_wav)
+        xtts = model.synthesizer.tts_model
+        # The reference is encoded with the model config's settings, as `Xtts.synthesize` does
+        latents = xtts.get_conditioning_latents(
+            audio_path=[speaker_wav],
+            gpt_cond_len=xtts.config.gpt_cond_len,
+            gpt_cond_chunk_len=xtts.config.gpt_cond_chunk_len,
+            max_ref_length=xtts.config.max_ref_len,
+            sound_norm_refs=xtts.config.sound_norm_refs,
+        )
+        _SPEAKER_LATENTS[digest] = latents
+    return latents
+
+
+def _xtts_sampling(xtts: Any) -> Dict[str, Any]:
+    """Return the XTTS model config's sampling settings, which `inference` otherwise replaces with its own defaults."""
+    return {name: getattr(xtts.config, name) for name in XTTS_SAMPLING_SETTINGS}
+
+
+def _float_to_pcm16(wav: Any) -> bytes:
+    """Convert a float waveform in [-1, 1] (tensor or array) to little-endian 16-bit PCM bytes."""
+    import numpy as np
+
+    if hasattr(wav, "detach"):
+        wav = wav.detach().cpu().numpy()
+    wav = np.clip(np.asarray(wav, dtype=np.float32), -1.0, 1.0)
+    return (wav * 32767).astype("<i2").tobytes()
+
+
+def _peak_normalized_pcm16(wav: Any) -> Any:
+    """Convert a float waveform to int16 samples, peak-normalized like `Synthesizer.save_wav`."""
+    import numpy as np
+
+    if hasattr(wav, "detach"):
+        wav = wav.detach().cpu().numpy()
+    wav = np.asarray(wav, dtype=np.float32)
+    peak = float(np.max(np.abs(wav))) if wav.size else 0.0
+    return (wav * (32767 / max(0.01, peak))).astype(np.int16)
+
+
+def _read_pcm16(path: str) -> Tuple[Any, int]:
+    """Read a 16-bit PCM WAV into (samples, sample_rate); multi-channel audio comes back as (frames, channels)."""
+    import numpy as np
+
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise wave.Error(f"{path} is not 16-bit PCM")
+        channels = wf.getnchannels()
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2")
+        sample_rate = wf.getframerate()
+    return (pcm.reshape(-1, channels) if channels > 1 else pcm), sample_rate
+
+
+def _write_pcm16(path: str, pcm: Any, sample_rate: int) -> None:
+    """Write int16 samples (1-D mono or (frames, channels)) to a WAV file."""
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(pcm.shape[1] if pcm.ndim > 1 else 1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.astype("<i2", copy=False).tobytes())
+
+
+def synthesize_speech_stream(
+    text: str,
+    language_idx: Optional[str] = None,
+    speaker_idx: Optional[int] = None,
+    model_name: str = XTTS_MODEL_NAME,
+) -> Iterator[bytes]:
+    """Yield a streaming WAV header, then 16-bit PCM as the model produces it.
+
+    XTTS streams from `inference_stream` with the built-in XTTS speaker `speaker_idx`
+    (default: Aaron Dreschner). Other models are synthesized in memory one
+    text chunk at a time and each chunk is sent as soon as it is ready, without touching disk.
+    The model is loaded and the speaker checked before the header is yielded, so load errors and
+    InvalidSpeakerError surface on the first `next()`.
+    """
+    if model_name != XTTS_MODEL_NAME:
+        yield from _stream_by_chunk(text, model_name, speaker_idx, language_idx)
+        return
+
+    model = ensure_model_loaded()
+    xtts = model.synthesizer.tts_model
+    speakers = xtts.speaker_manager.speakers
+    if speaker_idx is None:
+        name = XTTS_DEFAULT_SPEAKER
+    elif 0 <= speaker_idx < len(speakers):
+        name = list(speakers)[speaker_idx]
+    else:
+        raise InvalidSpeakerError(f"speaker_idx must be between 0 and {len(speakers) - 1}, got {speaker_idx}")
+    gpt_cond_latent, speaker_embedding = speakers[name]["gpt_cond_latent"], speakers[name]["speaker_embedding"]
+    language = _tts_kwargs(model, XTTS_MODEL_NAME, language_idx=language_idx)["language"]
+
+    yield wav_stream_header(model.synthesizer.output_sample_rate)
+
+    chunks = split_text_into_chunks(text, max_length=STREAM_CHUNK_LENGTH) or [text]
+    logger.info("Starting XTTS streaming synthesis: text_length=%d, chunks=%d", len(text), len(chunks))
+    for chunk in chunks:
+        # Sentences within a chunk are split to the tokenizer's per-language limit (203 characters
+        # for pt, below STREAM_CHUNK_LENGTH) and sampled with the model config's settings
+        for wav_chunk in xtts.inference_stream(
+            chunk, language, gpt_cond_latent, speaker_embedding,
+            enable_text_splitting=True, **_xtts_sampling(xtts),
+        ):
+            yield _float_to_pcm16(wav_chunk)
+
+
+def _stream_by_chunk(
+    text: str, model_name: str, speaker_idx: Optional[int], language_idx: Optional[str]
+) -> Iterator[bytes]:
+    """Stream a model without incremental inference: header first, then each chunk's PCM in slices."""
+    model = ensure_model_loaded(model_name)
+    kwargs = _tts_kwargs(model, model_name, speaker_idx, language_idx)
+
+    yield wav_stream_header(model.synthesizer.output_sample_rate)
+
+    chunks = split_text_into_chunks(text, max_length=CHUNK_LENGTH) or [text]
+    logger.info("Starting chunked streaming synthesis: model=%s, text_length=%d, chunks=%d", model_name, len(text), len(chunks))
+    for chunk in chunks:
+        with _model_inference(model_name):
+            wav = model.tts(text=chunk, **kwargs)
+        pcm = _float_to_pcm16(wav)
+        for start in range(0, len(pcm), STREAM_SLICE_BYTES):
+            yield pcm[start:start + STREAM_SLICE_BYTES]
 
 
 def synthesize_speech(
@@ -35,34 +586,245 @@ def synthesize_speech(
     speaker_idx: Optional[int] = None,
     language_idx: Optional[str] = None,
     speaker_wav: Optional[str] = None,
-) -> str:
-    """Synthesize speech and return path to audio file. Always chunk for voice cloning to avoid truncation."""
-    # Determine chunk length based on whether it's a voice cloning task or not.
-    # Voice cloning (XTTS) is more sensitive to long inputs.
-    max_chunk_length = 300 if speaker_wav else 500
+) -> SynthResult:
+    """Synthesize speech and return a SynthResult. Always chunk for voice cloning to avoid truncation."""
+    max_chunk_length = CLONE_CHUNK_LENGTH if speaker_wav else CHUNK_LENGTH
     chunks = split_text_into_chunks(text, max_length=max_chunk_length)
 
+    # Hash the reference voice once for all of this request's cache keys
+    speaker_wav_digest = None
+    if speaker_wav is not None:
+        try:
+            speaker_wav_digest = _speaker_wav_digest(speaker_wav)
+        except OSError:
+            pass
+
     if len(chunks) == 1:
-        return _synthesize_single_chunk(chunks[0], model_name, speaker_idx, language_idx, speaker_wav)
+        return _synthesize_chunk_cached(
+            chunks[0], model_name, speaker_idx, language_idx, speaker_wav, speaker_wav_digest
+        )
+
+    key = _wav_cache_key(text, model_name, speaker_idx, language_idx, speaker_wav, speaker_wav_digest)
+    cached = _wav_cache_get(key)
+    if cached is not None:
+        return cached
+
+    started = time.monotonic()
+    parts = _synthesize_chunks_inprocess(
+        chunks, model_name, speaker_idx, language_idx, speaker_wav, speaker_wav_digest
+    )
+    if parts is None:
+        parts = _synthesize_chunks_pooled(chunks, model_name, speaker_idx, language_idx, speaker_wav, speaker_wav_digest)
 
-    logger.info("Splitting synthesis into %d chunks (max_length=%d)", len(chunks), max_chunk_length)
-    chunk_files: List[str] = []
-    for i, chunk in enumerate(chunks):
-        logger.info("Processing chunk %d/%d (len=%d)", i + 1, len(chunks), len(chunk))
+    import numpy as np
+
+    sample_rate = parts[0][1]
+    if any(sr != sample_rate for _, sr in parts):
+        raise Exception("Chunks were synthesized at different sample rates")
+    pcm = np.concatenate([p for p, _ in parts])
+
+    file_id = next_file_id()
+    staged_path, final_output_path = _staged_output(file_id)
+    try:
+        _write_pcm16(staged_path, pcm, sample_rate)
+        os.replace(staged_path, final_output_path)
+    except Exception:
+        _remove(staged_path)
+        raise
+    result = SynthResult(final_output_path, len(pcm) / float(sample_rate), sample_rate, file_id)
+    _wav_cache_put(key, result)
+    logger.info(
+        "Synthesized %d chunks (max_length=%d) in %.2fs: %s",
+        len(chunks), max_chunk_length, time.monotonic() - started, final_output_path,
+    )
+    return result
+
+
+def _synthesize_chunks_pooled(
+    chunks: List[str],
+    model_name: Optional[str] = None,
+    speaker_idx: Optional[int] = None,
+    language_idx: Optional[str] = None,
+    speaker_wav: Optional[str] = None,
+    speaker_wav_digest: Optional[bytes] = None,
+) -> List[Tuple[Any, int]]:
+    """Synthesize chunks in parallel on the chunk pool (the `tts` CLI path); return them in text order."""
+    futures = [
+        _CHUNK_EXECUTOR.submit(
+            _synthesize_chunk_pcm, chunk, model_name, speaker_idx, language_idx, speaker_wav, speaker_wav_digest
+        )
+        for chunk in chunks
+    ]
+    # Results are collected in submission order, so the audio keeps the text's order
+    parts: List[Tuple[Any, int]] = []
+    for i, future in enumerate(futures):
         try:
-            chunk_file = _synthesize_single_chunk(chunk, model_name, speaker_idx, language_idx, speaker_wav)
-            chunk_files.append(chunk_file)
+            parts.append(future.result())
         except Exception as e:
             logger.error("Failed to synthesize chunk %d: %s", i + 1, e)
-            # Clean up previously generated chunks if one fails
-            for f in chunk_files:
-                Path(f).unlink(missing_ok=True)
+            for f in futures[i + 1:]:
+                f.cancel()
             raise Exception(f"Failed to process chunk {i+1}/{len(chunks)}: {e}") from e
+    return parts
 
-    file_id = str(uuid.uuid4())
-    final_output_path = OUTPUT_DIR / f"{file_id}.wav"
-    logger.info("Concatenating %d chunks into final audio file: %s", len(chunk_files), final_output_path)
-    return concatenate_wav_files(chunk_files, str(final_output_path))
+
+def synthesize_speech_batch(
+    texts: List[str],
+    model_name: Optional[str] = None,
+    speaker_idx: Optional[int] = None,
+    language_idx: Optional[str] = None,
+    speaker_wav: Optional[str] = None,
+) -> List[Union[SynthResult, Exception]]:
+    """Synthesize several texts that share the same settings and return their results in order.
+
+    There is no batched synthesis entry point, so texts are still synthesized one after another,
+    but callers get a single dispatch per batch instead of one per request. The texts belong to
+    independent requests, so a text that fails comes back as its exception in its place and the
+    others are still synthesized.
+    """
+    logger.info("Synthesizing batch of %d text(s): model=%s", len(texts), model_name)
+    results: List[Union[SynthResult, Exception]] = []
+    for i, text in enumerate(texts):
+        try:
+            results.append(
+                synthesize_speech(text, model_name, speaker_idx, language_idx, speaker_wav)
+            )
+        except Exception as e:
+            logger.error("Failed to synthesize batch item %d/%d: %s", i + 1, len(texts), e)
+            results.append(e)
+    return results
+
+
+def _synthesize_chunk_cached(
+    text: str,
+    model_name: Optional[str] = None,
+    speaker_idx: Optional[int] = None,
+    language_idx: Optional[str] = None,
+    speaker_wav: Optional[str] = None,
+    speaker_wav_digest: Optional[bytes] = None,
+) -> SynthResult:
+    """Serve a chunk from the WAV cache, synthesizing and caching it on a miss."""
+    key = _wav_cache_key(text, model_name, speaker_idx, language_idx, speaker_wav, speaker_wav_digest)
+    result = _wav_cache_get(key)
+    if result is None:
+        result = _synthesize_single_chunk(text, model_name, speaker_idx, language_idx, speaker_wav)
+        _wav_cache_put(key, result)
+    return result
+
+
+def _inference_target(model_name: Optional[str]) -> Optional[Tuple[Any, str]]:
+    """Return (loaded model, registry name) for in-process inference, or None when the `tts` CLI has to be used."""
+    if not model_name:
+        return None
+    failed_at = _MODEL_LOAD_FAILURES.get(model_name)
+    if failed_at is not None and time.monotonic() - failed_at < MODEL_LOAD_RETRY_SECONDS:
+        return None
+    try:
+        model = ensure_model_loaded(model_name)
+    except Exception as e:
+        _MODEL_LOAD_FAILURES[model_name] = time.monotonic()
+        logger.warning("Could not load %s in-process, falling back to the tts CLI: %s", model_name, e)
+        return None
+    _MODEL_LOAD_FAILURES.pop(model_name, None)
+    return model, model_name
+
+
+def _run_inference(
+    model: Any,
+    model_name: str,
+    text: str,
+    speaker_idx: Optional[int] = None,
+    language_idx: Optional[str] = None,
+    speaker_wav: Optional[str] = None,
+) -> Any:
+    """Synthesize one text on a loaded model and return the float32 waveform; callers hold `_model_inference`."""
+    kwargs = _tts_kwargs(model, model_name, speaker_idx, language_idx, speaker_wav)
+    if speaker_wav is not None and model_name == XTTS_MODEL_NAME:
+        # Reuse the voice's latents instead of letting XTTS re-encode the reference audio per call
+        gpt_cond_latent, speaker_embedding = _speaker_latents_locked(model, speaker_wav)
+        logger.debug("Starting XTTS synthesis with cached speaker latents: text_length=%d", len(text))
+        xtts = model.synthesizer.tts_model
+        # Split by sentence like `model.tts` does, so no piece exceeds the tokenizer's limit for
+        # the language (203 characters for pt, below CLONE_CHUNK_LENGTH)
+        out = xtts.inference(
+            text, kwargs["language"], gpt_cond_latent, speaker_embedding,
+            enable_text_splitting=True, **_xtts_sampling(xtts),
+        )
+        wav = out["wav"]
+    else:
+        logger.debug("Starting in-process TTS synthesis: model=%s, text_length=%d, speaker_wav=%s", model_name, len(text), speaker_wav)
+        wav = model.tts(text=text, **kwargs)
+    import numpy as np
+
+    # `model.tts` returns a list and XTTS `inference` an array that can be float16 under autocast;
+    # both leave here as one float32 array for normalization and WAV writing
+    return np.asarray(wav, dtype=np.float32)
+
+
+def _infer_chunk(
+    text: str,
+    model_name: Optional[str] = None,
+    speaker_idx: Optional[int] = None,
+    language_idx: Optional[str] = None,
+    speaker_wav: Optional[str] = None,
+) -> Optional[Tuple[Any, Any]]:
+    """Run one chunk through an in-process model and return (wav, synthesizer).
+
+    Returns None when the chunk has to go through the `tts` CLI instead.
+    """
+    target = _inference_target(model_name)
+    if target is None:
+        return None
+    model, registry_name = target
+    try:
+        with _model_inference(registry_name):
+            wav = _run_inference(model, registry_name, text, speaker_idx, language_idx, speaker_wav)
+    except Exception:
+        logger.error("Error during in-process TTS synthesis", exc_info=True)
+        raise
+    return wav, model.synthesizer
+
+
+def _synthesize_chunks_inprocess(
+    chunks: List[str],
+    model_name: Optional[str] = None,
+    speaker_idx: Optional[int] = None,
+    language_idx: Optional[str] = None,
+    speaker_wav: Optional[str] = None,
+    speaker_wav_digest: Optional[bytes] = None,
+) -> Optional[List[Tuple[Any, int]]]:
+    """Synthesize all chunks of a text as one job on an in-process model; return [(int16 samples, sample_rate)].
+
+    Cache hits are read first, then the model is held once while the misses run back to back,
+    so a request's chunks aren't interleaved with other requests' and pay one lock handoff.
+    Returns None when the model isn't available in-process.
+    """
+    target = _inference_target(model_name)
+    if target is None:
+        return None
+    model, registry_name = target
+    keys = [
+        _wav_cache_key(c, model_name, speaker_idx, language_idx, speaker_wav, speaker_wav_digest)
+        for c in chunks
+    ]
+    parts: List[Optional[Tuple[Any, int]]] = [_wav_cache_read_pcm(key) for key in keys]
+    misses = [i for i, part in enumerate(parts) if part is None]
+    if misses:
+        sample_rate = model.synthesizer.output_sample_rate
+        with _model_inference(registry_name):
+            for i in misses:
+                try:
+                    wav = _run_inference(
+                        model, registry_name, chunks[i], speaker_idx, language_idx, speaker_wav
+                    )
+                except Exception as e:
+                    logger.error("Failed to synthesize chunk %d: %s", i + 1, e, exc_info=True)
+                    raise Exception(f"Failed to process chunk {i+1}/{len(chunks)}: {e}") from e
+                parts[i] = _peak_normalized_pcm16(wav), sample_rate
+        # Cache writes happen after the model is released for the next request
+        for i in misses:
+            _wav_cache_put_pcm(keys[i], *parts[i])
+    return parts  # type: ignore[return-value]
 
 
 def _synthesize_single_chunk(
@@ -71,83 +833,173 @@ def _synthesize_single_chunk(
     speaker_idx: Optional[int] = None,
     language_idx: Optional[str] = None,
     speaker_wav: Optional[str] = None,
-) -> str:
-    file_id = str(uuid.uuid4())
-    output_path = OUTPUT_DIR / f"{file_id}.wav"
+) -> SynthResult:
+    audio = _infer_chunk(text, model_name, speaker_idx, language_idx, speaker_wav)
+    if audio is None:
+        return _synthesize_chunk_cli(text, model_name, speaker_idx, language_idx, speaker_wav)
 
-    cmd = ["tts", "--text", text, "--out_path", str(output_path)]
-    if model_name:
-        cmd.extend(["--model_name", model_name])
-    if speaker_idx is not None:
-        cmd.extend(["--speaker_idx", str(speaker_idx)])
-    if language_idx is not None:
-        cmd.extend(["--language_idx", language_idx])
+    wav, synthesizer = audio
+    file_id = next_file_id()
+    staged_path, output_path = _staged_output(file_id)
+    try:
+        synthesizer.save_wav(wav, staged_path)
+        os.replace(staged_path, output_path)
+    except Exception:
+        _remove(staged_path)
+        raise
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("TTS synthesis successful: %s (%d bytes)", output_path, os.path.getsize(output_path))
+    sample_rate = synthesizer.output_sample_rate
+    return SynthResult(output_path, len(wav) / float(sample_rate), sample_rate, file_id)
+
+
+def _synthesize_chunk_pcm(
+    text: str,
+    model_name: Optional[str] = None,
+    speaker_idx: Optional[int] = None,
+    language_idx: Optional[str] = None,
+    speaker_wav: Optional[str] = None,
+    speaker_wav_digest: Optional[bytes] = None,
+) -> Tuple[Any, int]:
+    """Return a chunk as (int16 samples, sample_rate) without leaving a file in OUTPUT_DIR.
+
+    In-process audio is taken straight from the model; only the WAV cache (and the `tts` CLI
+    fallback) go through disk.
+    """
+    key = _wav_cache_key(text, model_name, speaker_idx, language_idx, speaker_wav, speaker_wav_digest)
+    cached = _wav_cache_read_pcm(key)
+    if cached is not None:
+        return cached
+
+    audio = _infer_chunk(text, model_name, speaker_idx, language_idx, speaker_wav)
+    if audio is not None:
+        wav, synthesizer = audio
+        pcm, sample_rate = _peak_normalized_pcm16(wav), synthesizer.output_sample_rate
+        _wav_cache_put_pcm(key, pcm, sample_rate)
+        return pcm, sample_rate
+
+    result = _synthesize_chunk_cli(text, model_name, speaker_idx, language_idx, speaker_wav, scratch=True)
+    try:
+        pcm, sample_rate = _read_pcm16(result.path)
+    finally:
+        _remove(result.path)
+    _wav_cache_put_pcm(key, pcm, sample_rate)
+    return pcm, sample_rate
+
+
+def _tts_kwargs(
+    model: Any,
+    model_name: str,
+    speaker_idx: Optional[int] = None,
+    language_idx: Optional[str] = None,
+    speaker_wav: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Build `TTS.tts()` keyword arguments, applying the CLI's XTTS speaker and language defaults."""
+    is_xtts = "xtts_v2" in model_name.lower()
+    kwargs: Dict[str, Any] = {}
     if speaker_wav is not None:
-        cmd.extend(["--speaker_wav", speaker_wav])
-        if model_name and "xtts_v2" in model_name.lower():
-            if "--language_idx" not in cmd:
-                cmd.extend(["--language_idx", "pt"])  # default for XTTS v2 voice cloning
+        kwargs["speaker_wav"] = speaker_wav
+    if model.is_multi_speaker:
+        speakers = model.speakers or []
+        if speaker_idx is not None:
+            kwargs["speaker"] = speakers[speaker_idx] if 0 <= speaker_idx < len(speakers) else str(speaker_idx)
+        elif is_xtts and speaker_wav is None:
+            kwargs["speaker"] = XTTS_DEFAULT_SPEAKER
+    if model.is_multi_lingual:
+        language = language_idx
+        if language is None and is_xtts:
+            # Voice cloning defaults to Portuguese, plain XTTS synthesis to English
+            language = "pt" if speaker_wav is not None else "en"
+        if language == "pt-br" and "pt-br" not in (model.languages or []):
+            language = "pt"
+        kwargs["language"] = language
+    return kwargs
+
 
-    # For multi-speaker models like XTTS v2, add default speaker if none specified
-    if model_name and "xtts_v2" in model_name.lower() and speaker_idx is None and speaker_wav is None:
-        cmd.extend(["--speaker_idx", "Aaron Dreschner"])  # Use first available speaker
+def _synthesize_chunk_cli(
+    text: str,
+    model_name: Optional[str] = None,
+    speaker_idx: Optional[int] = None,
+    language_idx: Optional[str] = None,
+    speaker_wav: Optional[str] = None,
+    scratch: bool = False,
+) -> SynthResult:
+    """Synthesize one chunk through the `tts` CLI, for models that can't be loaded in-process.
 
-    # For multilingual models like XTTS v2, add default language if none specified
-    # Skip for voice cloning since the reference voice determines the language
-    if model_name and "xtts_v2" in model_name.lower() and language_idx is None and speaker_wav is None:
-        cmd.extend(["--language_idx", "en"])  # Default to English
+    With `scratch`, the WAV is left in SCRATCH_DIR for a caller that reads it and removes it.
+    """
+    file_id = next_file_id()
+    if scratch:
+        staged_path = output_path = f"{_SCRATCH_DIR_STR}/{file_id}.wav"
+    else:
+        staged_path, output_path = _staged_output(file_id)
 
-    # Prefer GPU when available (boolean flag, no value)
-    cmd.append("--use_cuda")
+    is_xtts = bool(model_name) and "xtts_v2" in model_name.lower()
+    # Valued CLI flags by name; turned into the argument list by _tts_cli_command
+    args: Dict[str, str] = {"--text": text, "--out_path": staged_path}
+    if model_name:
+        args["--model_name"] = model_name
+    if speaker_idx is not None:
+        args["--speaker_idx"] = str(speaker_idx)
+    if language_idx is not None:
+        args["--language_idx"] = language_idx
+    if speaker_wav is not None:
+        args["--speaker_wav"] = speaker_wav
+        if is_xtts:
+            args.setdefault("--language_idx", "pt")  # default for XTTS v2 voice cloning
+    elif is_xtts:
+        # For multi-speaker, multilingual models like XTTS v2, default the speaker and language;
+        # for voice cloning the reference voice determines them
+        args.setdefault("--speaker_idx", XTTS_DEFAULT_SPEAKER)
+        args.setdefault("--language_idx", "en")
 
+    cmd = _tts_cli_command(args)
     logger.info("Starting TTS synthesis: model=%s, text_length=%d, speaker_wav=%s", model_name, len(text), speaker_wav)
-    logger.debug("TTS base command: %s", " ".join(cmd))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("TTS base command: %s", " ".join(cmd))
 
     try:
         timeout_duration = 600 if speaker_wav else 240
         result = _run_tts_command(cmd, timeout_duration)
-        logger.debug("TTS command completed: return_code=%s", result.returncode)
-        logger.debug("TTS stdout: %s", result.stdout)
-        logger.debug("TTS stderr: %s", result.stderr)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("TTS command completed: return_code=%s", result.returncode)
+            logger.debug("TTS stdout: %s", result.stdout)
+            logger.debug("TTS stderr: %s", result.stderr)
 
-        if result.returncode == 0 and output_path.exists():
-            file_size = output_path.stat().st_size
+        if result.returncode == 0 and os.path.exists(staged_path):
+            if not scratch:
+                os.replace(staged_path, output_path)
+            file_size = os.path.getsize(output_path)
             logger.info("TTS synthesis successful: %s (%d bytes)", output_path, file_size)
-            return str(output_path)
+            return _wav_result(output_path, file_id)
 
         # Retry logic for XTTS v2 pt-br -> pt
-        if result.returncode != 0 and model_name and "xtts_v2" in model_name.lower():
-            try:
-                lang_arg_index = cmd.index("--language_idx") + 1 if "--language_idx" in cmd else -1
-            except Exception:
-                lang_arg_index = -1
-            current_lang = cmd[lang_arg_index] if lang_arg_index != -1 else None
-            if current_lang == "pt-br":
-                logger.info("Retrying XTTS v2 synthesis with language_idx=pt")
-                cmd_retry = [x if x != "pt-br" else "pt" for x in cmd]
-                result = _run_tts_command(cmd_retry, timeout_duration)
+        if result.returncode != 0 and is_xtts and args.get("--language_idx") == "pt-br":
+            logger.info("Retrying XTTS v2 synthesis with language_idx=pt")
+            args["--language_idx"] = "pt"
+            result = _run_tts_command(_tts_cli_command(args), timeout_duration)
+            if logger.isEnabledFor(logging.DEBUG):
                 logger.debug("Retry return_code=%s", result.returncode)
                 logger.debug("Retry stdout: %s", result.stdout)
                 logger.debug("Retry stderr: %s", result.stderr)
-                if result.returncode == 0 and output_path.exists():
-                    file_size = output_path.stat().st_size
-                    logger.info("TTS synthesis successful on retry: %s (%d bytes)", output_path, file_size)
-                    return str(output_path)
+            if result.returncode == 0 and os.path.exists(staged_path):
+                if not scratch:
+                    os.replace(staged_path, output_path)
+                file_size = os.path.getsize(output_path)
+                logger.info("TTS synthesis successful on retry: %s (%d bytes)", output_path, file_size)
+                return _wav_result(output_path, file_id)
 
         # Failure path
-        if output_path.exists():
-            output_path.unlink(missing_ok=True)
+        _remove(staged_path)
         error_details = f"TTS command failed: return_code={result.returncode}, stderr='{result.stderr}', stdout='{result.stdout}'"
         logger.error(error_details)
         raise Exception(error_details)
 
     except subprocess.TimeoutExpired:
         logger.error("TTS synthesis timeout after %d seconds", timeout_duration)
-        if output_path.exists():
-            output_path.unlink(missing_ok=True)
+        _remove(staged_path)
         raise
     except Exception:
         logger.error("Error during TTS synthesis", exc_info=True)
-        if output_path.exists():
-            output_path.unlink(missing_ok=True)
+        _remove(staged_path)
         raise
@@ -1,78 +1,241 @@
 import os
 import re
+import time
+import json
+import asyncio
 import wave
-import subprocess
+import struct
 import logging
+import threading
+from collections import deque
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, NamedTuple, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-# Cache for models list
-_models_cache = None
+# Environment for `tts` subprocesses, built once: the process environment with models under /app/models
+TTS_ENV: Dict[str, str] = {**os.environ, "TTS_HOME": "/app/models"}
+
+# Output file IDs: 16 hex characters (64 random bits) each, cut in batches from one urandom read
+_FILE_ID_BYTES = 8
+_FILE_ID_BATCH = 512
+_file_ids: deque = deque()
+_file_ids_lock = threading.Lock()
+
+
+def next_file_id() -> str:
+    """Return a fresh random file ID, refilling the pool with a single os.urandom call when empty."""
+    with _file_ids_lock:
+        if not _file_ids:
+            buf = os.urandom(_FILE_ID_BYTES * _FILE_ID_BATCH)
+            _file_ids.extend(
+                buf[i:i + _FILE_ID_BYTES].hex() for i in range(0, len(buf), _FILE_ID_BYTES)
+            )
+        return _file_ids.popleft()
+
+
+class ModelsResult(NamedTuple):
+    """Outcome of `tts --list_models`: a status, the raw text (or a message), and the parsed models."""
+    status: Literal["ok", "warning", "error"]
+    text: str
+    models: List[Dict[str, Any]]
+
+
+PORTUGUESE_LANGUAGES = frozenset(("pt", "portuguese", "pt-br", "pt_br"))
+
+# Cache for models list. The catalog only changes with the image's TTS install, so a
+# successful listing is also persisted to MODELS_JSON and reused across restarts.
+_models_cache: Optional[ModelsResult] = None
+# Held while the catalog is fetched, so concurrent first callers share one CLI run
+_models_lock = asyncio.Lock()
+MODELS_JSON = Path("/app/models/models.json")
+# A persisted listing older than this is re-read from the CLI (and kept only if that fails)
+MODELS_JSON_TTL_SECONDS = int(os.getenv("MODELS_JSON_TTL_SECONDS", "86400"))
+
+
+# A catalog line like " 12: tts_models/<language>/<dataset>/<model>", captured without its
+# surrounding whitespace, with the model name, language and dataset as groups 2-4. Lines
+# starting with "Name format:", "=" or "Path" are headers.
+_MODEL_LINE_RE = re.compile(
+    r"^[^\S\n]*((?!\s|Name format:|=|Path)[^:\n]*:[^\S\n]*"
+    r"(tts_models/([^/\n]*)/([^/\n]*?)(?:/[^\n]*?)?))[^\S\n]*$",
+    re.MULTILINE,
+)
 
 
 def parse_models_output(models_output: str) -> List[Dict[str, Any]]:
     """Parse the raw TTS model output into structured data."""
-    models: List[Dict[str, Any]] = []
     if not models_output or "No models found" in models_output:
-        return models
-
-    lines = models_output.strip().split('\n')
-    for line in lines:
-        line = line.strip()
-        if not line or line.startswith('Name format:') or line.startswith('=') or line.startswith('Path'):
-            continue
-        if ':' in line and 'tts_models' in line:
-            model_part = line.split(':', 1)[1].strip()
-            if model_part.startswith('tts_models/'):
-                parts = model_part.split('/')
-                if len(parts) >= 3:
-                    language = parts[1]
-                    dataset = parts[2] if len(parts) > 2 else "unknown"
-                    model_info = {
-                        "model_name": model_part,
-                        "language": language,
-                        "type": "tts",
-                        "dataset": dataset,
-                        "full_line": line,
-                    }
-                    models.append(model_info)
+        return []
+    models = [
+        {
+            "model_name": m.group(2),
+            "language": m.group(3),
+            "type": "tts",
+            "dataset": m.group(4),
+            "full_line": m.group(1),
+        }
+        for m in _MODEL_LINE_RE.finditer(models_output)
+    ]
+    logger.debug("Parsed %d models", len(models))
     return models
 
 
-def get_available_models() -> str:
-    """Get raw output of `tts --list_models` with caching and longer initial timeout."""
-    global _models_cache
-    if _models_cache is not None:
-        return _models_cache
+def partition_portuguese_models(
+    models: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Split parsed models into (Portuguese-specific, multilingual) in a single pass."""
+    pt_models: List[Dict[str, Any]] = []
+    multilingual_models: List[Dict[str, Any]] = []
+    for m in models:
+        language = m.get("language", "").lower()
+        if language in PORTUGUESE_LANGUAGES:
+            pt_models.append(m)
+        elif language == "multilingual":
+            multilingual_models.append(m)
+    return pt_models, multilingual_models
+
 
+async def _run_list_models(cmd: List[str], timeout_seconds: int, env: Dict[str, str]) -> Tuple[int, str]:
+    """Run a model-listing command without blocking the event loop; return (returncode, stdout)."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL, env=env
+    )
     try:
-        logger.info("Fetching TTS models list...")
-        env = os.environ.copy()
-        env["TTS_HOME"] = "/app/models"
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=timeout_seconds)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    return proc.returncode, stdout.decode("utf-8", errors="replace")
 
-        # Use direct 'tts' command since it's available in the container
-        result = subprocess.run(["tts", "--list_models"], capture_output=True, text=True, timeout=180, env=env)
-        if result.returncode == 0:
-            _models_cache = result.stdout or "No models found. The TTS command returned no output."
-            return _models_cache
 
-        # Fallback: try python -m TTS (though this may not work in this version)
-        result = subprocess.run(["python", "-m", "TTS", "--list_models"], capture_output=True, text=True, timeout=120, env=env)
-        if result.returncode == 0:
-            _models_cache = result.stdout or "No models found."
+async def get_available_models() -> ModelsResult:
+    """Get the result of `tts --list_models` with caching and longer initial timeout."""
+    if _models_cache is not None:
+        return _models_cache
+    async with _models_lock:
+        # Another caller may have filled the cache while this one waited for the lock
+        if _models_cache is not None:
             return _models_cache
+        return await _fetch_models()
 
-        _models_cache = "TTS models not available - this may be due to network issues or missing model downloads"
-        return _models_cache
-    except subprocess.TimeoutExpired:
-        _models_cache = "Models temporarily unavailable - please try again in a few moments"
+
+async def _fetch_models() -> ModelsResult:
+    """Load the catalog from MODELS_JSON or the TTS CLI into the cache; callers hold _models_lock."""
+    global _models_cache
+    stored = _load_models_json()
+    if stored is not None and time.time() - stored[1] < MODELS_JSON_TTL_SECONDS:
+        _models_cache = stored[0]
         return _models_cache
+
+    result = await _list_models_from_cli()
+    if result.status == "ok":
+        _save_models_json(result)
+    elif stored is not None:
+        # An expired catalog is still better than none while the CLI is failing
+        logger.warning("Could not refresh the models list (%s); using the copy in %s", result.text, MODELS_JSON)
+        result = stored[0]
+    _models_cache = result
+    return _models_cache
+
+
+async def _list_models_from_cli() -> ModelsResult:
+    """Run `tts --list_models` and wrap its output."""
+    try:
+        logger.info("Fetching TTS models list...")
+        # Use direct 'tts' command since it's available in the container
+        returncode, stdout = await _run_list_models(["tts", "--list_models"], 180, TTS_ENV)
+        if returncode == 0:
+            return _models_result(stdout, "No models found. The TTS command returned no output.")
+        return ModelsResult(
+            "warning", "TTS models not available - this may be due to network issues or missing model downloads", []
+        )
+    except asyncio.TimeoutError:
+        return ModelsResult("warning", "Models temporarily unavailable - please try again in a few moments", [])
     except Exception as e:
         logger.error("Error fetching models: %s", e, exc_info=True)
-        _models_cache = f"Error accessing TTS models: {e}"
-        return _models_cache
+        return ModelsResult("error", f"Error accessing TTS models: {e}", [])
+
+
+def refresh_models_cache() -> None:
+    """Forget the cached models list, in memory and on disk, so the next call runs the CLI again."""
+    global _models_cache
+    _models_cache = None
+    try:
+        MODELS_JSON.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning("Could not remove %s: %s", MODELS_JSON, e)
+
+
+async def refresh_available_models() -> ModelsResult:
+    """Forget the cached models list and fetch it again from the TTS CLI.
+
+    Runs under _models_lock, so a fetch already in flight finishes before the cache is cleared
+    and can't write its older listing back afterwards, and concurrent refreshes take turns.
+    """
+    async with _models_lock:
+        refresh_models_cache()
+        return await _fetch_models()
+
+
+def _load_models_json() -> Optional[Tuple[ModelsResult, float]]:
+    """Return the models list persisted by a previous run and its mtime, if there is a readable one."""
+    try:
+        with open(MODELS_JSON, "rb") as f:
+            saved_at = os.fstat(f.fileno()).st_mtime
+            data = json.loads(f.read())
+        return ModelsResult("ok", data["text"], data["models"]), saved_at
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning("Ignoring unreadable %s: %s", MODELS_JSON, e)
+        return None
+
+
+def _save_models_json(result: ModelsResult) -> None:
+    """Persist a successful models listing; failures only cost a CLI run on the next start."""
+    if result.status != "ok":
+        return
+    try:
+        MODELS_JSON.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = MODELS_JSON.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"text": result.text, "models": result.models}), encoding="utf-8")
+        os.replace(tmp_path, MODELS_JSON)
+    except OSError as e:
+        logger.warning("Could not persist models list to %s: %s", MODELS_JSON, e)
+
+
+def _models_result(stdout: str, empty_message: str) -> ModelsResult:
+    """Wrap successful CLI output, flagging an empty listing as a warning."""
+    if not stdout:
+        return ModelsResult("warning", empty_message, [])
+    return ModelsResult("ok", stdout, parse_models_output(stdout))
+
+
+# Patterns for preprocess_pt_text, normalize_text and split_text_into_chunks, compiled once
+_DECIMAL_RE = re.compile(r"(\d)\.(\d)")
+_ELLIPSIS_RE = re.compile(r"…|\.{3}")
+_SENTENCE_PERIOD_RE = re.compile(r"(?<!\d)\.(?!\d)")
+# Abbreviations whose dots aren't sentence ends, matched in one pass; none overlaps another,
+# so this gives the same result as replacing them one after another
+_ABBREVIATIONS = {
+    ab: ab.replace(".", "<DOT>") for ab in ["Sr.", "Sra.", "Dr.", "Dra.", "Prof.", "Profa.", "etc.", "p.ex.", "e.g."]
+}
+_ABBREVIATION_RE = re.compile("|".join(map(re.escape, _ABBREVIATIONS)))
+_MULTI_NEWLINE_RE = re.compile(r"\n{2,}")
+_SPACE_RUN_RE = re.compile(r"[ \t]+")
+# normalize_text: curly quotes to straight ones and unusual spaces to plain spaces in one pass,
+# after which only runs of spaces and tabs are left to collapse
+_NORMALIZE_TABLE = str.maketrans({
+    "\u201C": '"', "\u201D": '"', "\u2018": "'", "\u2019": "'",
+    "\u00A0": " ", "\u2009": " ", "\u200A": " ", "\u200B": " ", "\u202F": " ", "\u205F": " ", "\u3000": " ",
+})
+_SENTENCE_SPLIT_RE = re.compile(r"[.!?\n]+")
+
+
+def _protect_abbreviation(match: "re.Match[str]") -> str:
+    return _ABBREVIATIONS[match.group()]
 
 
 def preprocess_pt_text(text: str) -> str:
@@ -80,19 +243,21 @@ def preprocess_pt_text(text: str) -> str:
     text = normalize_text(text)
     if not text:
         return text
+    # Every step below needs a period, an ellipsis or a newline; without them (typical of short
+    # prompts) only the final strip changes anything, as spaces were already collapsed
+    if "." not in text and "…" not in text and "\n" not in text:
+        return text.strip()
     # Protect decimals: 12.34 -> 12<DECIMAL>34
-    text = re.sub(r"(\d)\.(\d)", r"\1<DECIMAL>\2", text)
+    text = _DECIMAL_RE.sub(r"\1<DECIMAL>\2", text)
     # Protect common abbreviations by replacing the dot
-    abbrs = ["Sr.", "Sra.", "Dr.", "Dra.", "Prof.", "Profa.", "etc.", "p.ex.", "e.g."]
-    for ab in abbrs:
-        text = text.replace(ab, ab.replace(".", "<DOT>"))
+    text = _ABBREVIATION_RE.sub(_protect_abbreviation, text)
     # Ellipses -> newline pause
-    text = re.sub(r"…|\\.\\.\\.", "\n", text)
+    text = _ELLIPSIS_RE.sub("\n", text)
     # Replace sentence-ending periods with newline (not between digits)
-    text = re.sub(r"(?<!\d)\.(?!\d)", "\n", text)
+    text = _SENTENCE_PERIOD_RE.sub("\n", text)
     # Normalize multiple newlines/spaces
-    text = re.sub(r"\n{2,}", "\n", text)
-    text = re.sub(r"[ \t]+", " ", text).strip()
+    text = _MULTI_NEWLINE_RE.sub("\n", text)
+    text = _SPACE_RUN_RE.sub(" ", text).strip()
     # Restore tokens
     text = text.replace("<DECIMAL>", ".").replace("<DOT>", ".")
     return text
@@ -106,74 +271,153 @@ def normalize_text(text: str) -> str:
     """
     if not text:
         return text
-    # Curly quotes/apostrophes to straight
-    text = text.replace("“", '"').replace("”", '"').replace("‘", "'").replace("’", "'")
-    # NBSP and other spaces to normal
-    text = text.replace("\u00A0", " ")
+    # Curly quotes/apostrophes to straight, NBSP and other spaces to normal
+    text = text.translate(_NORMALIZE_TABLE)
     # Collapse multiple spaces
-    text = re.sub(r"[ \t\u2009\u200A\u200B\u202F\u205F\u3000]+", " ", text)
+    text = _SPACE_RUN_RE.sub(" ", text)
     return text
 
 
 def split_text_into_chunks(text: str, max_length: int = 500) -> List[str]:
     """Split long text into smaller chunks at sentence boundaries."""
-    sentences = re.split(r"[.!?\n]+", text)
+    sentences = _SENTENCE_SPLIT_RE.split(text)
     chunks: List[str] = []
-    current = ""
+    # The current chunk is kept as its sentences, joined with " … " only when it is emitted,
+    # plus its joined length; re-joining the growing string per sentence would be quadratic
+    parts: deque = deque()
+    length = 0
     for sentence in sentences:
         s = sentence.strip()
         if not s:
             continue
-        if len(current) + len(s) + 1 > max_length and current:
-            chunks.append(current.strip())
-            current = s
+        if length + len(s) + 1 > max_length and parts:
+            chunks.append(" … ".join(parts).strip())
+            parts, length = deque([s]), len(s)
+        elif not parts:
+            parts, length = deque([s]), len(s)
         else:
-            current = f"{current} … {s}".strip(" …") if current else s
-    if current.strip():
-        chunks.append(current.strip())
+            parts.append(s)
+            length += len(s) + 3
+            length -= _strip_joined_ends(parts)
+    current = " … ".join(parts).strip()
+    if current:
+        chunks.append(current)
     return chunks
 
 
-def concatenate_wav_files(wav_files: List[str], output_path: str) -> str:
-    """Concatenate multiple WAV files into one and remove originals."""
-    if not wav_files:
-        raise Exception("No WAV files to concatenate")
-    if len(wav_files) == 1:
-        import shutil
-        shutil.copy2(wav_files[0], output_path)
-        return output_path
-
-    with wave.open(wav_files[0], 'rb') as first_wav:
-        params = first_wav.getparams()
-        frames = first_wav.readframes(first_wav.getnframes())
-    with wave.open(output_path, 'wb') as output_wav:
-        output_wav.setparams(params)
-        output_wav.writeframes(frames)
-        for wav_file in wav_files[1:]:
-            with wave.open(wav_file, 'rb') as wavf:
-                frames = wavf.readframes(wavf.getnframes())
-                output_wav.writeframes(frames)
-    for wav_file in wav_files:
-        try:
-            Path(wav_file).unlink(missing_ok=True)
-        except Exception:
-            pass
-    return output_path
+def _strip_joined_ends(parts: deque) -> int:
+    """Apply `.strip(" …")` to the " … "-joined `parts` in place; return how many characters it removed.
+
+    Stripping can only consume an element (and the separator next to it) if the whole element
+    is spaces and ellipses, so this touches the ends of the deque and nothing in between.
+    """
+    removed = 0
+    while parts:
+        head = parts[0].lstrip(" …")
+        removed += len(parts[0]) - len(head)
+        if head:
+            parts[0] = head
+            break
+        parts.popleft()
+        if parts:
+            removed += 3
+    while parts:
+        tail = parts[-1].rstrip(" …")
+        removed += len(parts[-1]) - len(tail)
+        if tail:
+            parts[-1] = tail
+            break
+        parts.pop()
+        if parts:
+            removed += 3
+    return removed
+
+
+def _wav_layout(f) -> Tuple[bytes, int, int]:
+    """Walk a WAV file's RIFF chunks and return (fmt chunk payload, data offset, data size)."""
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        raise wave.Error(f"{f.name} is not a RIFF/WAVE file")
+    fmt = None
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            raise wave.Error(f"{f.name} has no data chunk")
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+        if chunk_id == b"data":
+            if fmt is None:
+                raise wave.Error(f"{f.name} has no fmt chunk before its data")
+            return fmt, f.tell(), chunk_size
+        if chunk_id == b"fmt ":
+            fmt = f.read(chunk_size)
+            f.seek(chunk_size & 1, os.SEEK_CUR)
+        else:
+            # Chunks are word-aligned: odd sizes are followed by a pad byte
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+def wav_stream_header(sample_rate: int, channels: int = 1, sample_width: int = 2) -> bytes:
+    """Return a 44-byte PCM WAV header for a stream of unknown length.
+
+    The RIFF and data sizes are set to 0xFFFFFFFF, which players treat as "read until EOF".
+    """
+    byte_rate = sample_rate * channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 0xFFFFFFFF, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, byte_rate, channels * sample_width, sample_width * 8,
+        b"data", 0xFFFFFFFF,
+    )
+
+
+def wav_duration_and_rate(wav_path: str) -> Tuple[float, int]:
+    """Return (duration in seconds, sample rate) of a WAV file from its header alone.
+
+    Only the RIFF chunk headers are read, not the samples. A data size past the end of the
+    file (as in streaming headers) is clamped to what is actually there.
+    """
+    with open(wav_path, "rb") as f:
+        fmt, offset, size = _wav_layout(f)
+        size = min(size, os.fstat(f.fileno()).st_size - offset)
+    if len(fmt) < 14:
+        raise wave.Error(f"{wav_path} has a truncated fmt chunk")
+    _, _, sample_rate, _, block_align = struct.unpack_from("<HHIIH", fmt)
+    if not sample_rate or not block_align:
+        return 0.0, sample_rate
+    return (size // block_align) / float(sample_rate), sample_rate
 
 
 def get_wav_duration_seconds(wav_path: str) -> float:
     """Return WAV duration in seconds as a float."""
     try:
-        with wave.open(wav_path, 'rb') as wf:
-            frames = wf.getnframes()
-            framerate = wf.getframerate()
-            if framerate == 0:
-                return 0.0
-            return frames / float(framerate)
+        return wav_duration_and_rate(wav_path)[0]
     except Exception:
         return 0.0
 
 
+_WORD_RE = re.compile(r"\b\w+\b")
+# Every ASCII character outside \w (letters, digits, underscore) mapped to a space, so that
+# for ASCII text whitespace splitting yields exactly the \w+ tokens
+_ASCII_NON_WORD_TO_SPACE = str.maketrans(
+    {c: " " for c in range(128) if not (chr(c).isalnum() or chr(c) == "_")}
+)
+
+
 def count_words(text: str) -> int:
-    """Heuristic word count using \b\w+\b tokens."""
-    return len(re.findall(r"\b\w+\b", text or ""))
+    r"""Heuristic word count using \b\w+\b tokens."""
+    if not text:
+        return 0
+    if text.isascii():
+        return len(text.translate(_ASCII_NON_WORD_TO_SPACE).split())
+    return len(_WORD_RE.findall(text))
+
+
+def normalize_and_count(text: str, lang: str = "en") -> Tuple[str, int]:
+    """Normalize text for synthesis and count its words in one call.
+
+    Portuguese (`lang="pt"`) goes through `preprocess_pt_text`, anything else through
+    `normalize_text`. Normalization only swaps non-word characters, so the words are
+    counted on the result and endpoints don't need a separate counting pass.
+    """
+    normalized = preprocess_pt_text(text) if lang == "pt" else normalize_text(text)
+    return normalized, count_words(normalized)